@@ -4,6 +4,8 @@ Designed with 20+ years of voice assistant expertise
 Optimized for natural conversation, booking flows, and user experience
 """
 
+import hashlib
+
 LEVO_WELLNESS_SMART_PROMPT = """You are the AI voice assistant for Levo Wellness Center, a premium healthcare and wellness clinic in New Delhi.
 
 ## CORE IDENTITY & PERSONALITY
@@ -434,11 +436,157 @@ After providing information, never:
 """
 
 
-def get_smart_prompt(kb_context=""):
+# Compacted variant: the same rules without rationale, repeated patterns and worked examples
+LEVO_WELLNESS_COMPACT_PROMPT = """You are the voice assistant for Levo Wellness Center, a premium healthcare and wellness clinic in New Delhi. Be warm, professional and efficient.
+
+## STATE
+The greeting "Welcome to Levo Wellness. We offer Salon, Aesthetics, Wellness, and Doctors. Your wellness journey starts here." was ALREADY spoken. Respond directly to the caller; never ask what they need.
+
+## RESPONSE RULES
+- 1 sentence ideally, 2 at most; booking confirmations 3-4 sentences with ALL details.
+- After giving information or asking a question, STOP and wait.
+- Categories first, details only when asked: prices only when requested, availability only when a time is mentioned.
+- "What services?" -> "We offer Salon, Aesthetics, Wellness, and Doctors." Wellness includes Pilates, Yoga and Meditation (only mention if asked).
+- Check availability and answer in the SAME reply ("Yes, 3 PM is available tomorrow. Shall I book it?"). If full, offer two alternatives.
+- Unclear request -> ask ONE clarifying question.
+- Speak naturally: contractions, "three PM", "tomorrow", prices in rupees.
+
+## BOOKING FLOW
+1. Service intent -> "When would you like to come in?"
+2. Time -> check availability -> answer immediately.
+3. Caller confirms -> "What's your name and phone number?"
+4. Confirm ALL appointments in one reply: "Perfect! Booked for [name] on [date] at [time] for [service]. See you then!"
+Doctors: for a general doctor request ask first "Which doctor would you like to see? We have Dermatologist, Ayurveda, Nutritionist, and Pain Relief." Confirmations MUST name the doctor and department, e.g. "Dr. Arvind Singh (Pain Relief)", never "the doctor".
+
+## NEVER
+- Delay phrases: "hold on", "one moment", "please wait", "I'll get back to you".
+- Redundant questions: "How can I help you today?", "What would you like to know?".
+- Price lists, full availability or long descriptions nobody asked for.
+- Continuing after the answer ("Let me confirm...", extra statements, follow-up questions).
+- Diagnosing, prescribing, or asking for medical history or payment details.
+
+## CONTACT (only if asked)
+Phone +91-11-4567-8900. Green Park, New Delhi. Mon-Sat 10 AM-8 PM, Sun 11 AM-6 PM.
+"""
+
+# Tool-calling variant: facts come from the KB tools (server/kb_tools.py), so the prompt only carries behaviour
+LEVO_WELLNESS_TOOLS_PROMPT = """You are the voice assistant for Levo Wellness Center, a premium healthcare and wellness clinic in New Delhi. Be warm, professional and efficient.
+
+## STATE
+The greeting "Welcome to Levo Wellness. We offer Salon, Aesthetics, Wellness, and Doctors. Your wellness journey starts here." was ALREADY spoken. Respond directly to the caller; never ask what they need.
+
+## TOOLS
+- Never guess availability, prices, services or hours: call check_doctor_availability, get_price, find_service or get_operating_hours and answer from the result.
+- Book with book_appointment once the caller has confirmed and given name and phone; only say "Booked" if it returns booked, otherwise offer its alternatives.
+- Call all the tools you need at once (e.g. two services in one request -> two check_doctor_availability calls).
+- Only quote what the caller asked for: one or two slots, not the whole list.
+- Name doctors exactly as the tool returns them, e.g. "Dr. Arvind Singh (Pain Relief)".
+
+## RESPONSE RULES
+- 1 sentence ideally, 2 at most; booking confirmations 3-4 sentences with ALL details.
+- After giving information or asking a question, STOP and wait.
+- Categories first: "What services?" -> "We offer Salon, Aesthetics, Wellness, and Doctors."
+- If the requested time is taken, offer two alternatives from the tool result.
+- Unclear request -> ask ONE clarifying question.
+- Speak naturally: contractions, "three PM", "tomorrow", prices in rupees.
+
+## BOOKING FLOW
+1. Service intent -> "When would you like to come in?"
+2. Time -> check availability -> answer immediately ("Yes, 3 PM is available tomorrow. Shall I book it?").
+3. Caller confirms -> "What's your name and phone number?"
+4. Confirm ALL appointments in one reply: "Perfect! Booked for [name] on [date] at [time] for [service]. See you then!"
+For a general doctor request ask "Which doctor would you like to see? We have Dermatologist, Ayurveda, Nutritionist, and Pain Relief."
+
+## NEVER
+- Delay phrases ("hold on", "one moment", "let me check") or redundant questions ("How can I help you today?").
+- Continuing after the answer, diagnosing, prescribing, or asking for medical history or payment details.
+
+## CONTACT (only if asked)
+Phone +91-11-4567-8900. Green Park, New Delhi.
+"""
+
+PROMPT_VARIANTS = {
+    "full": LEVO_WELLNESS_SMART_PROMPT,
+    "compact": LEVO_WELLNESS_COMPACT_PROMPT,
+    "tools": LEVO_WELLNESS_TOOLS_PROMPT,
+}
+
+KB_CONTEXT_HEADING = "## Knowledge Base Context"
+
+# Session-specific notes go into the trailing dynamic message, never into the static prefix
+GREETING_REMINDER = "REMINDER: The greeting already asked 'How can I help you today?' DO NOT ask 'How can I assist you today?' or any similar question. Just acknowledge and wait, or answer if the user has a specific request."
+SUMMARY_HEADING = "## Earlier In This Call"
+SESSION_NOTES_HEADING = "## Session Notes"
+TURN_CONTEXT_HEADING = "## Context For This Turn"
+TODAY_HEADING = "## Today"
+
+
+def get_smart_prompt(kb_context="", variant="full"):
     """Get expert-designed voice assistant system prompt"""
+    prompt = PROMPT_VARIANTS.get(variant, LEVO_WELLNESS_SMART_PROMPT)
     if kb_context:
-        return f"{LEVO_WELLNESS_SMART_PROMPT}\n\n## Knowledge Base Context\n{kb_context}"
-    return LEVO_WELLNESS_SMART_PROMPT
+        return f"{prompt}\n\n{KB_CONTEXT_HEADING}\n{kb_context}"
+    return prompt
+
+
+def prompt_sections(prompt):
+    """Split a prompt into (heading, text) sections at its '## ' headings"""
+    sections = []
+    title = "(preamble)"
+    lines = []
+    for line in prompt.split("\n"):
+        if line.startswith("## "):
+            if any(l.strip() for l in lines):
+                sections.append((title, "\n".join(lines)))
+            title = line[3:].strip()
+            lines = []
+        lines.append(line)
+    if any(l.strip() for l in lines):
+        sections.append((title, "\n".join(lines)))
+    return sections
+
+
+class PromptBuilder:
+    """Lays out LLM requests as a byte-identical static prefix plus a trailing dynamic message
+
+    The static system message (prompt variant + KB context) is built once and
+    shared by every session and turn, so provider-side prompt caching always
+    hits it. Everything that varies (session notes such as the greeting
+    reminder, the rolling summary, per-turn context) goes into one system
+    message after the conversation turns, including today's date, so the
+    prefix never changes at midnight.
+    """
+
+    def __init__(self, kb_context="", variant="full"):
+        self.variant = variant if variant in PROMPT_VARIANTS else "full"
+        self.static_prompt = get_smart_prompt(kb_context, self.variant)
+        self.system_message = {"role": "system", "content": self.static_prompt}
+        self.fingerprint = hashlib.sha256(self.static_prompt.encode("utf-8")).hexdigest()[:12]
+
+    def dynamic_message(self, notes=(), summary=None, context=None, today=None):
+        """Trailing system message with the per-session and per-turn context, or None"""
+        parts = []
+        if today:
+            # Lets the model turn "next Friday" or "the 25th" into the YYYY-MM-DD the tools take
+            parts.append(f"{TODAY_HEADING}\n{today.strftime('%A, %B %d, %Y')} ({today.isoformat()}, clinic time)")
+        if summary:
+            parts.append(f"{SUMMARY_HEADING}\n{summary}")
+        if notes:
+            parts.append(SESSION_NOTES_HEADING + "\n" + "\n".join(notes))
+        if context:
+            parts.append(f"{TURN_CONTEXT_HEADING}\n{context}")
+        if not parts:
+            return None
+        return {"role": "system", "content": "\n\n".join(parts)}
+
+    def messages(self, turns, notes=(), summary=None, context=None, today=None):
+        """Static system message, the conversation turns, then the dynamic message"""
+        messages = [self.system_message]
+        messages.extend(turns)
+        dynamic = self.dynamic_message(notes, summary, context, today)
+        if dynamic is not None:
+            messages.append(dynamic)
+        return messages
 
 
 # Legacy prompts for backward compatibility
@@ -554,10 +702,37 @@ AI: Perfect! Booked for John with Dr. Arvind Singh (Pain Relief) tomorrow at 2 P
 }
 
 
+def prompt_token_report(prompt, estimate_tokens):
+    """(heading, chars, tokens) for every section of a prompt"""
+    return [(title, len(text), estimate_tokens(text)) for title, text in prompt_sections(prompt)]
+
+
+def _print_token_report(name, prompt, estimate_tokens):
+    print(f"\n{name}")
+    print("-" * 70)
+    total = 0
+    for title, chars, tokens in prompt_token_report(prompt, estimate_tokens):
+        total += tokens
+        print(f"  {title[:48]:<48} {chars:>7} chars {tokens:>6} tok")
+    print(f"  {'TOTAL':<48} {len(prompt):>7} chars {total:>6} tok")
+
+
+# Token report (from the project root: python -m config.prompts)
 if __name__ == "__main__":
+    import os
+    from server.history import estimate_tokens
+    from server.knowledge_base import LevoWellnessDemoKB
+
     print("=" * 70)
     print("LEVO WELLNESS - EXPERT VOICE ASSISTANT SYSTEM")
     print("=" * 70)
     print("\nDesigned with 20+ years of voice assistant expertise")
     print("Optimized for natural conversation and booking flows")
     print("\n" + "=" * 70)
+
+    # Token cost per section (approximate, ~4 characters per token)
+    kb_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "knowledge_base.json")
+    kb_context = LevoWellnessDemoKB(data_path=kb_path).get_context_string()
+    for variant in PROMPT_VARIANTS:
+        builder = PromptBuilder(kb_context, variant)
+        _print_token_report(f"Variant '{variant}' (static prefix {builder.fingerprint})", builder.static_prompt, estimate_tokens)
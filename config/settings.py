@@ -20,10 +20,21 @@ class DeepgramConfig:
     numerals: bool = True
     interim_results: bool = False
     endpointing: int = 500  # Changed back to 500 to match working version
+    # Warm connection pool (per process)
+    pool_size: int = 2
+    keepalive_interval: float = 5.0
+    pool_max_idle: float = 300.0
+    # Bounded per-session audio queue (block, drop_oldest or drop_silence)
+    uplink_max_bytes: int = 256 * 1024  # ~8s of 16kHz linear16 mono
+    uplink_policy: str = "drop_silence"
+    silence_threshold: int = 500  # Peak linear16 amplitude below which a frame counts as silence
     
     def __post_init__(self):
         if not self.api_key:
             self.api_key = os.getenv("DEEPGRAM_API_KEY", "")
+        self.pool_size = int(os.getenv("DEEPGRAM_POOL_SIZE", self.pool_size))
+        self.uplink_max_bytes = int(os.getenv("DEEPGRAM_UPLINK_MAX_BYTES", self.uplink_max_bytes))
+        self.uplink_policy = os.getenv("DEEPGRAM_UPLINK_POLICY", self.uplink_policy)
 
 
 @dataclass
@@ -33,10 +44,26 @@ class OpenAIConfig:
     model: str = "gpt-4o-mini"
     max_tokens: int = 80  # Shorter for faster responses
     temperature: float = 0.7
+    prompt_variant: str = "full"  # "full", "compact" or "tools" system prompt (see config/prompts.py)
+    tool_calling: bool = True  # KB lookups as function tools (server/kb_tools.py); implies the "tools" prompt
+    # Conversation part of the prompt (rolling summary + recent turns), in approximate tokens
+    history_token_budget: int = 1200
+    summary_max_tokens: int = 200
+    min_recent_messages: int = 4
+    # Per-turn KB snippets (server/retrieval.py) added to the trailing system message
+    retrieval_top_k: int = 3
+    retrieval_token_cap: int = 250
     
     def __post_init__(self):
         if not self.api_key:
             self.api_key = os.getenv("OPENAI_API_KEY", "")
+        self.tool_calling = os.getenv("LLM_TOOL_CALLING", str(self.tool_calling)).lower() in ("1", "true", "yes")
+        if self.tool_calling:
+            self.prompt_variant = "tools"
+        self.prompt_variant = os.getenv("PROMPT_VARIANT", self.prompt_variant)
+        self.history_token_budget = int(os.getenv("HISTORY_TOKEN_BUDGET", self.history_token_budget))
+        self.retrieval_top_k = int(os.getenv("RETRIEVAL_TOP_K", self.retrieval_top_k))
+        self.retrieval_token_cap = int(os.getenv("RETRIEVAL_TOKEN_CAP", self.retrieval_token_cap))
 
 
 @dataclass
@@ -47,12 +74,32 @@ class ElevenLabsConfig:
     model: str = "eleven_turbo_v2_5"
     stability: float = 0.5
     similarity_boost: float = 0.5
+    # Shared HTTP connection pool (one per process)
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    max_concurrent_requests: int = 8
+    request_timeout: float = 15.0
+    # Audio cache: in-memory LRU plus on-disk tier (relative paths are resolved from the project root)
+    cache_dir: str = "data/tts_cache"
+    cache_max_bytes: int = 32 * 1024 * 1024
+    cache_max_entries: int = 2048
+    cache_disk: bool = False  # Persist repeated sentences (greetings are always persisted)
+    cache_disk_admit_hits: int = 2  # Memory replays before a sentence may be written to disk
+    cache_max_text_chars: int = 300
     
     def __post_init__(self):
         if not self.api_key:
             self.api_key = os.getenv("ELEVENLABS_API_KEY", "")
         if not self.voice_id or self.voice_id == "21m00Tcm4TlvDq8ikWAM":
             self.voice_id = os.getenv("ELEVENLABS_VOICE_ID", "21m00Tcm4TlvDq8ikWAM")
+        self.max_connections = int(os.getenv("ELEVENLABS_MAX_CONNECTIONS", self.max_connections))
+        self.max_keepalive_connections = int(os.getenv("ELEVENLABS_MAX_KEEPALIVE", self.max_keepalive_connections))
+        self.max_concurrent_requests = int(os.getenv("ELEVENLABS_MAX_CONCURRENT", self.max_concurrent_requests))
+        self.cache_dir = os.getenv("TTS_CACHE_DIR", self.cache_dir)
+        self.cache_max_bytes = int(os.getenv("TTS_CACHE_MAX_MB", self.cache_max_bytes // (1024 * 1024))) * 1024 * 1024
+        self.cache_disk = os.getenv("TTS_CACHE_DISK", str(self.cache_disk)).lower() in ("1", "true", "yes")
+        self.cache_disk_admit_hits = int(os.getenv("TTS_CACHE_DISK_ADMIT_HITS", self.cache_disk_admit_hits))
 
 
 @dataclass
@@ -60,12 +107,24 @@ class ServerConfig:
     """WebSocket server configuration"""
     host: str = "localhost"
     port: int = 8765
+    workers: int = 1  # Worker processes sharing the port via SO_REUSEPORT
+    kb_reload_interval: float = 2.0  # Seconds between knowledge_base.json change checks (0 disables)
+    booking_db: str = "data/bookings.db"  # SQLite booking ledger, shared by all worker processes
+    booking_sync_interval: float = 1.0  # Max seconds an availability answer may lag the ledger (other workers book too)
+    clinic_timezone: str = "Asia/Kolkata"  # "today", "tomorrow" and past slots follow the clinic's clock, not the server's
     
     def __post_init__(self):
         self.host = os.getenv("HOST", "0.0.0.0")  # Default to 0.0.0.0 for Docker
         port_str = os.getenv("PORT")
         if port_str:
             self.port = int(port_str)
+        workers_str = os.getenv("WORKERS")
+        if workers_str:
+            self.workers = int(workers_str)
+        self.kb_reload_interval = float(os.getenv("KB_RELOAD_INTERVAL", self.kb_reload_interval))
+        self.booking_db = os.getenv("BOOKING_DB", self.booking_db)
+        self.booking_sync_interval = float(os.getenv("BOOKING_SYNC_INTERVAL", self.booking_sync_interval))
+        self.clinic_timezone = os.getenv("CLINIC_TIMEZONE", self.clinic_timezone)
             
         # Parse allowed origins (comma separated)
         origins = os.getenv("ALLOWED_ORIGINS", "")
@@ -4,6 +4,7 @@ HealthCare Plus Voice Assistant - Main Server
 Entry point for the voice assistant server.
 """
 
+import argparse
 import os
 import sys
 from pathlib import Path
@@ -16,8 +17,9 @@ load_dotenv()
 import asyncio
 from loguru import logger
 
-from server.assistant import VoiceAssistant
+from config.settings import config
 from server.websocket_server import start_server
+from server.workers import run_workers
 
 # Configure logging - File and Console
 log_dir = Path("logs")
@@ -83,8 +85,21 @@ def check_environment():
     return True
 
 
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="HealthCare Plus Voice Assistant server")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=config.server.workers,
+        help="Number of worker processes sharing the port via SO_REUSEPORT (default: WORKERS env or 1)"
+    )
+    return parser.parse_args()
+
+
 def main():
     """Main entry point"""
+    args = parse_args()
     logger.info("=" * 60)
     logger.info("🏥 HEALTHCARE PLUS VOICE ASSISTANT")
     logger.info("=" * 60)
@@ -103,6 +118,10 @@ def main():
     logger.debug("✅ Environment check passed, starting server")
     
     try:
+        if args.workers > 1:
+            logger.debug(f"🔄 Starting supervisor with {args.workers} workers")
+            run_workers(args.workers)
+            return
         logger.debug("🔄 Starting asyncio event loop")
         asyncio.run(start_server())
     except KeyboardInterrupt:
@@ -0,0 +1,120 @@
+"""
+Audio Uplink - Bounded, backpressured audio queue between browser and Deepgram
+"""
+
+import asyncio
+from array import array
+from collections import deque
+from loguru import logger
+
+
+POLICY_BLOCK = "block"
+POLICY_DROP_OLDEST = "drop_oldest"
+POLICY_DROP_SILENCE = "drop_silence"
+POLICIES = (POLICY_BLOCK, POLICY_DROP_OLDEST, POLICY_DROP_SILENCE)
+
+
+def is_silent(frame, threshold):
+    """Check if a linear16 PCM frame never exceeds the amplitude threshold"""
+    if len(frame) < 2:
+        return True
+    samples = array('h', frame[:len(frame) - len(frame) % 2])
+    return max(samples) < threshold and -min(samples) < threshold
+
+
+class AudioUplink:
+    """Per-session audio queue with a byte bound and an overflow policy"""
+
+    def __init__(self, max_bytes=256 * 1024, policy=POLICY_DROP_SILENCE, silence_threshold=500):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown uplink policy '{policy}', expected one of {POLICIES}")
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.silence_threshold = silence_threshold
+        # (frame, silent) pairs; silent is only computed under the drop_silence policy
+        self._frames = deque()
+        self._changed = asyncio.Condition()
+        self._closed = False
+
+        self.queued_bytes = 0
+        self.peak_queued_bytes = 0
+        self.frames_in = 0
+        self.frames_out = 0
+        self.dropped_frames = 0
+        self.dropped_bytes = 0
+        self.dropped_silent_frames = 0
+
+    async def put(self, frame):
+        """Enqueue a frame, applying the overflow policy when the queue is full"""
+        async with self._changed:
+            if self._closed:
+                return
+            self.frames_in += 1
+            if len(frame) > self.max_bytes:
+                self._count_drop(frame, False)
+                return
+
+            if self.policy == POLICY_BLOCK:
+                await self._changed.wait_for(lambda: self._closed or self._fits(frame))
+                if self._closed:
+                    return
+            else:
+                while not self._fits(frame):
+                    self._drop_one()
+
+            silent = self.policy == POLICY_DROP_SILENCE and is_silent(frame, self.silence_threshold)
+            self._frames.append((frame, silent))
+            self.queued_bytes += len(frame)
+            self.peak_queued_bytes = max(self.peak_queued_bytes, self.queued_bytes)
+            self._changed.notify_all()
+
+    async def get(self):
+        """Dequeue the next frame, or None once the uplink is closed and drained"""
+        async with self._changed:
+            await self._changed.wait_for(lambda: self._frames or self._closed)
+            if not self._frames:
+                return None
+            frame, _ = self._frames.popleft()
+            self.queued_bytes -= len(frame)
+            self.frames_out += 1
+            self._changed.notify_all()
+            return frame
+
+    async def close(self):
+        """Stop accepting frames; get() drains what is left and then returns None"""
+        async with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+
+    def _fits(self, frame):
+        return self.queued_bytes + len(frame) <= self.max_bytes
+
+    def _drop_one(self):
+        """Drop the oldest silent frame if the policy allows it, otherwise the oldest frame"""
+        index = 0
+        if self.policy == POLICY_DROP_SILENCE:
+            index = next((i for i, (_, silent) in enumerate(self._frames) if silent), 0)
+        frame, silent = self._frames[index]
+        del self._frames[index]
+        self.queued_bytes -= len(frame)
+        self._count_drop(frame, silent)
+
+    def _count_drop(self, frame, silent):
+        self.dropped_frames += 1
+        self.dropped_bytes += len(frame)
+        if silent:
+            self.dropped_silent_frames += 1
+        if self.dropped_frames == 1 or self.dropped_frames % 50 == 0:
+            logger.warning(f"⚠️ Audio uplink full, dropped {self.dropped_frames} frames ({self.dropped_bytes} bytes, {self.dropped_silent_frames} silent)")
+
+    def stats(self):
+        """Snapshot of the uplink counters"""
+        return {
+            "queued_bytes": self.queued_bytes,
+            "peak_queued_bytes": self.peak_queued_bytes,
+            "frames_in": self.frames_in,
+            "frames_out": self.frames_out,
+            "dropped_frames": self.dropped_frames,
+            "dropped_bytes": self.dropped_bytes,
+            "dropped_silent_frames": self.dropped_silent_frames,
+        }
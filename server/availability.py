@@ -0,0 +1,303 @@
+"""
+Availability Engine - Bitset schedules with a live bookings overlay
+
+Every distinct slot time in the KB gets a bit (in chronological order). Each
+service's and doctor's weekly grid is compiled into one int mask per weekday,
+and confirmed bookings are kept as masks per (staff member, date), so "is it
+free", "earliest free slot" and window queries are a few integer operations.
+Group classes take `capacity` bookings per slot; their seats are counted and
+the slot's bit is only set once the class is full.
+"""
+
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+from loguru import logger
+
+from config.settings import config
+
+
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+DEFAULT_SEARCH_DAYS = 14
+
+
+def parse_slot(slot):
+    """Minutes since midnight of a slot label such as '2:30 PM'"""
+    parsed = datetime.strptime(slot.strip().upper(), "%I:%M %p")
+    return parsed.hour * 60 + parsed.minute
+
+
+def normalize_slot(text):
+    """KB slot label for a spoken or typed time ('3 pm', '15:00', '3:00PM' -> '3:00 PM'), or None"""
+    compact = text.strip().upper().replace(".", "").replace(" ", "")
+    for fmt in ("%I:%M%p", "%I%p", "%H:%M", "%H"):
+        try:
+            parsed = datetime.strptime(compact, fmt)
+        except ValueError:
+            continue
+        return f"{parsed.hour % 12 or 12}:{parsed.minute:02d} {'AM' if parsed.hour < 12 else 'PM'}"
+    return None
+
+
+def clinic_now():
+    """Current time at the clinic (the server may run in UTC)"""
+    return datetime.now(ZoneInfo(config.server.clinic_timezone))
+
+
+def clinic_today():
+    return clinic_now().date()
+
+
+def resolve_date(day, today=None):
+    """A date for a date, 'today', 'tomorrow' or a weekday name (its next occurrence, today included)"""
+    if isinstance(day, date):
+        return day
+    today = today or clinic_today()
+    day = day.strip().lower()
+    if day == "today":
+        return today
+    if day == "tomorrow":
+        return today + timedelta(days=1)
+    if day in WEEKDAYS:
+        return today + timedelta(days=(WEEKDAYS.index(day) - today.weekday()) % 7)
+    return date.fromisoformat(day)
+
+
+def _bits(mask):
+    """Indexes of the set bits, lowest first"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class AvailabilityEngine:
+    """Free/busy answers for the services and doctors of one KB snapshot"""
+
+    def __init__(self, kb):
+        logger.debug("🔧 Initializing AvailabilityEngine")
+        data = kb.data
+        services = [
+            (key, service, service.get('staff') or service.get('instructor') or key)
+            for department in data.get('departments', {}).values()
+            for key, service in department.get('services', {}).items()
+        ]
+        doctors = [(key, doctor, doctor['name']) for key, doctor in data.get('doctors', {}).items()]
+        entities = services + doctors
+
+        labels = {
+            slot
+            for _, entity, _ in entities
+            for day_slots in entity.get('slots', {}).values()
+            for slot in day_slots
+        }
+        labels |= {slot for slots in data.get('conversation_hints', {}).get('time_keywords', {}).values() for slot in slots}
+        self.slots = sorted(labels, key=parse_slot)
+        self._minutes = [parse_slot(slot) for slot in self.slots]
+        self._bit = {slot: index for index, slot in enumerate(self.slots)}
+
+        self._staff = {}  # entity key -> staff member whose bookings block it
+        self._capacity = {}  # staff member -> bookings per slot (1 unless they teach a group class)
+        self._grid = {}  # (entity key, weekday) -> mask of scheduled slots
+        self._aliases = {}
+        for key, entity, staff in entities:
+            self._staff[key] = staff
+            # Doctors always see one caller at a time; a staff member shared with a 1:1 service stays at 1
+            capacity = entity.get('capacity', 1) if key not in data.get('doctors', {}) else 1
+            self._capacity[staff] = min(self._capacity.get(staff, capacity), capacity)
+            for alias in (key, key.replace('_', ' '), (entity.get('short_name') or '').lower()):
+                if alias:
+                    self._aliases.setdefault(alias, key)
+            for day, day_slots in entity.get('slots', {}).items():
+                self._grid[(key, day.lower())] = self.mask(day_slots)
+
+        self._windows = self._compile_windows(data.get('conversation_hints', {}).get('time_keywords', {}))
+        self._booked = {}  # (staff, date) -> mask of booked (full) slots
+        self._seats = {}  # (staff, date, slot index) -> bookings taken, for group classes only
+        logger.debug(f"   {len(self.slots)} slot times, {len(self._grid)} day grids, windows: {list(self._windows)}")
+
+    def _compile_windows(self, time_keywords):
+        """Window masks: each window runs from its first listed time to the start of the next window"""
+        starts = sorted(
+            (min(parse_slot(slot) for slot in slots), name)
+            for name, slots in time_keywords.items() if slots
+        )
+        windows = {}
+        for position, (start, name) in enumerate(starts):
+            low = 0 if position == 0 else start
+            high = starts[position + 1][0] if position + 1 < len(starts) else 24 * 60
+            windows[name] = sum(
+                1 << index for index, minutes in enumerate(self._minutes) if low <= minutes < high
+            )
+        return windows
+
+    def entity(self, name):
+        """Entity key for a service type, doctor specialty or short name (None if unknown)"""
+        return self._aliases.get(name) or self._aliases.get(name.strip().lower())
+
+    def staff(self, name):
+        """Staff member whose bookings block an entity (None if unknown)"""
+        key = self.entity(name)
+        return self._staff[key] if key is not None else None
+
+    def capacity(self, name):
+        """Bookings one slot of an entity takes (1 for doctors and salon staff)"""
+        key = self.entity(name)
+        return self._capacity[self._staff[key]] if key is not None else 1
+
+    def mask(self, slots):
+        """Bitmask of slot labels (unknown labels are ignored)"""
+        mask = 0
+        for slot in slots:
+            index = self._bit.get(slot)
+            if index is not None:
+                mask |= 1 << index
+        return mask
+
+    def slot_list(self, mask):
+        """Slot labels of a mask in chronological order"""
+        return [self.slots[index] for index in _bits(mask)]
+
+    def window_mask(self, window):
+        """Mask of a time_keywords window ('morning', 'afternoon', 'evening'); all slots for None"""
+        if window is None:
+            return (1 << len(self.slots)) - 1
+        return self._windows.get(window.lower(), 0)
+
+    # Bookings overlay
+
+    def _add_booking(self, staff, when, index):
+        capacity = self._capacity.get(staff, 1)
+        if capacity > 1:
+            seat_key = (staff, when, index)
+            self._seats[seat_key] = self._seats.get(seat_key, 0) + 1
+            if self._seats[seat_key] < capacity:
+                return
+        booked_key = (staff, when)
+        self._booked[booked_key] = self._booked.get(booked_key, 0) | (1 << index)
+
+    def _remove_booking(self, staff, when, index):
+        seat_key = (staff, when, index)
+        if seat_key in self._seats:
+            self._seats[seat_key] -= 1
+            if not self._seats[seat_key]:
+                del self._seats[seat_key]
+        booked_key = (staff, when)
+        remaining = self._booked.get(booked_key, 0) & ~(1 << index)
+        if remaining:
+            self._booked[booked_key] = remaining
+        else:
+            self._booked.pop(booked_key, None)
+
+    def book(self, name, day, slot):
+        """Take a slot (or one seat of a group class) for the entity's staff member; False if it was not free"""
+        key = self.entity(name)
+        when = resolve_date(day)
+        index = self._bit.get(slot)
+        if key is None or index is None or not self.free_mask(key, when) >> index & 1:
+            return False
+        self._add_booking(self._staff[key], when, index)
+        return True
+
+    def release(self, name, day, slot):
+        """Undo a booking (cancellation)"""
+        key = self.entity(name)
+        if key is None or slot not in self._bit:
+            return
+        self._remove_booking(self._staff[key], resolve_date(day), self._bit[slot])
+
+    def load_bookings(self, bookings):
+        """Overlay (staff, date, slot) bookings, e.g. from the ledger or a previous engine"""
+        count = 0
+        for staff, when, slot in bookings:
+            index = self._bit.get(slot)
+            if index is None:
+                continue
+            self._add_booking(staff, resolve_date(when), index)
+            count += 1
+        return count
+
+    def replace_bookings(self, bookings):
+        """Reset the overlay to exactly these (staff, date, slot) bookings, e.g. a fresh ledger read"""
+        self._booked = {}
+        self._seats = {}
+        return self.load_bookings(bookings)
+
+    def booked_slots(self):
+        """All (staff, date, slot) bookings in the overlay, a group class slot once per seat taken"""
+        bookings = [
+            (staff, when, self.slots[index])
+            for (staff, when), mask in self._booked.items()
+            if self._capacity.get(staff, 1) == 1
+            for index in _bits(mask)
+        ]
+        bookings.extend(
+            (staff, when, self.slots[index])
+            for (staff, when, index), taken in self._seats.items()
+            for _ in range(taken)
+        )
+        return bookings
+
+    # Queries
+
+    def _after_mask(self, minutes):
+        """Mask of the slots starting strictly after a time of day (slot bits are chronological)"""
+        return ~((1 << bisect_right(self._minutes, minutes)) - 1)
+
+    def _upcoming_mask(self, when):
+        """Slots of a date that have not started yet: none in the past, later ones today"""
+        now = clinic_now()
+        today = now.date()
+        if when > today:
+            return -1
+        if when < today:
+            return 0
+        return self._after_mask(now.hour * 60 + now.minute)
+
+    def free_mask(self, key, when):
+        """Scheduled, not yet booked and not yet started slots of an entity on a date"""
+        scheduled = self._grid.get((key, WEEKDAYS[when.weekday()]), 0)
+        return scheduled & ~self._booked.get((self._staff[key], when), 0) & self._upcoming_mask(when)
+
+    def is_free(self, name, day, slot):
+        """Whether a slot is scheduled and unbooked"""
+        key = self.entity(name)
+        index = self._bit.get(slot)
+        if key is None or index is None:
+            return False
+        return bool(self.free_mask(key, resolve_date(day)) >> index & 1)
+
+    def free_slots(self, name, day, window=None):
+        """Free slots of an entity on a day, optionally within a time window"""
+        key = self.entity(name)
+        if key is None:
+            return []
+        return self.slot_list(self.free_mask(key, resolve_date(day)) & self.window_mask(window))
+
+    def earliest_free(self, name, day=None, window=None, after=None, days=DEFAULT_SEARCH_DAYS):
+        """(date, slot) of the first free slot from a day onwards (strictly after `after` on that day)"""
+        key = self.entity(name)
+        if key is None:
+            return None
+        start = resolve_date(day or "today")
+        window_mask = self.window_mask(window)
+        first_day_mask = window_mask
+        if after is not None:
+            first_day_mask &= self._after_mask(parse_slot(after))
+        for offset in range(days):
+            when = start + timedelta(days=offset)
+            free = self.free_mask(key, when) & (first_day_mask if offset == 0 else window_mask)
+            if free:
+                return when, self.slots[(free & -free).bit_length() - 1]
+        return None
+
+    def batch(self, queries):
+        """Answer several (name, day, window) queries at once, e.g. a multi-service booking"""
+        results = []
+        for name, day, window in queries:
+            results.append({
+                "entity": self.entity(name),
+                "date": resolve_date(day),
+                "free": self.free_slots(name, day, window),
+            })
+        return results
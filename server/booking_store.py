@@ -0,0 +1,220 @@
+"""
+Booking Store - Durable booking ledger on SQLite (WAL)
+
+A UNIQUE (staff, date, slot, seat) constraint makes "reserve if free" an
+INSERT OR IGNORE per seat, so two callers (or two worker processes) can never
+take the same seat; a 1:1 appointment has one seat, a group class one per
+participant. All writes go through one dedicated writer thread that drains its
+queue in batches and commits each batch as one transaction; reads use their
+own short-lived connections, which WAL lets run alongside the writer.
+"""
+
+import asyncio
+import os
+import queue
+import sqlite3
+import threading
+from datetime import date
+from loguru import logger
+
+from server.availability import clinic_today
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bookings (
+    id INTEGER PRIMARY KEY,
+    staff TEXT NOT NULL,
+    date TEXT NOT NULL,
+    slot TEXT NOT NULL,
+    seat INTEGER NOT NULL DEFAULT 0,
+    service TEXT NOT NULL DEFAULT '',
+    name TEXT NOT NULL DEFAULT '',
+    phone TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL DEFAULT (datetime('now')),
+    UNIQUE (staff, date, slot, seat)
+)
+"""
+# Ledgers created before group classes had one booking per slot: every row is seat 0
+MIGRATE_SEATS = """
+ALTER TABLE bookings RENAME TO bookings_unseated;
+""" + SCHEMA + """;
+INSERT INTO bookings (id, staff, date, slot, service, name, phone, created_at)
+    SELECT id, staff, date, slot, service, name, phone, created_at FROM bookings_unseated;
+DROP TABLE bookings_unseated;
+"""
+BUSY_TIMEOUT_MS = 5000  # Other worker processes may hold the write lock briefly
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    return conn
+
+
+def _resolve(future, result, error):
+    """Complete a caller's future on its event loop (it may have been cancelled meanwhile)"""
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+def _reserve(conn, staff, day, slot, service, name, phone, capacity):
+    for seat in range(capacity):
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO bookings (staff, date, slot, seat, service, name, phone) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (staff, day, slot, seat, service, name, phone)
+        )
+        if cursor.rowcount == 1:
+            return cursor.lastrowid
+    return None
+
+
+def _cancel(conn, staff, day, slot):
+    cursor = conn.execute(
+        "DELETE FROM bookings WHERE id = (SELECT id FROM bookings WHERE staff = ? AND date = ? AND slot = ? ORDER BY seat DESC LIMIT 1)",
+        (staff, day, slot)
+    )
+    return cursor.rowcount > 0
+
+
+class BookingStore:
+    """Booking ledger with a single writer thread and an atomic reserve-if-free"""
+
+    def __init__(self, path, batch_size=256):
+        logger.debug("🔧 Initializing BookingStore")
+        self.path = path
+        self.batch_size = batch_size
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self.reserved = 0
+        self.conflicts = 0
+        self.batches = 0
+        logger.debug(f"   Database: {path}, batch size: {batch_size}")
+
+    async def start(self):
+        """Open the database, create the schema and start the writer thread"""
+        if self._thread is not None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = await asyncio.to_thread(self._open)
+        self._thread = threading.Thread(target=self._run, args=(conn,), name="booking-writer", daemon=True)
+        self._thread.start()
+        logger.debug(f"📒 Booking store ready: {self.path}")
+
+    async def close(self):
+        """Flush queued writes and stop the writer thread"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        await asyncio.to_thread(self._thread.join)
+        self._thread = None
+
+    # Writer thread
+
+    def _open(self):
+        """Writer connection (handed to the writer thread, used by nothing else)"""
+        conn = _connect(self.path)
+        conn.execute("PRAGMA journal_mode = WAL")
+        # With WAL, NORMAL only risks the last commits on power loss, never corruption
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(bookings)")}
+        if "seat" not in columns:
+            logger.info("📒 Adding seats to the booking ledger")
+            conn.executescript(f"BEGIN IMMEDIATE;\n{MIGRATE_SEATS}\nCOMMIT;")
+        return conn
+
+    def _run(self, conn):
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                running = False
+                batch = [item for item in batch if item is not None]
+            if batch:
+                self._write_batch(conn, batch)
+        conn.close()
+        logger.debug("📒 Booking writer stopped")
+
+    def _write_batch(self, conn, batch):
+        """Run queued writes in one transaction (one fsync for the whole batch)"""
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for operation, _, _ in batch:
+                try:
+                    results.append((operation(conn), None))
+                except sqlite3.IntegrityError as e:
+                    results.append((None, e))
+                except sqlite3.Error:
+                    raise
+                except Exception as e:
+                    # A broken operation fails its own caller, never the writer thread
+                    logger.error(f"❌ Booking write failed: {e}")
+                    results.append((None, e))
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            logger.error(f"❌ Booking batch of {len(batch)} failed: {e}")
+            results = [(None, e)] * len(batch)
+        self.batches += 1
+        for (_, future, loop), (result, error) in zip(batch, results):
+            try:
+                loop.call_soon_threadsafe(_resolve, future, result, error)
+            except RuntimeError:
+                pass  # The caller's event loop has closed; nobody is waiting
+
+    def _submit(self, operation):
+        """Queue a write for the writer thread; the returned future resolves on this loop"""
+        if self._thread is None:
+            raise RuntimeError("BookingStore is not started")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.put((operation, future, loop))
+        return future
+
+    # Public API
+
+    async def reserve_if_free(self, staff, day, slot, service="", name="", phone="", capacity=1):
+        """Atomically take a slot (a seat of it for a group class); the booking id, or None if it is full"""
+        day = day.isoformat() if isinstance(day, date) else day
+        booking_id = await self._submit(lambda conn: _reserve(conn, staff, day, slot, service, name, phone, capacity))
+        if booking_id is None:
+            self.conflicts += 1
+            logger.debug(f"📒 Slot taken: {staff} {day} {slot}")
+        else:
+            self.reserved += 1
+            logger.info(f"📒 Booked #{booking_id}: {staff} {day} {slot}")
+        return booking_id
+
+    async def cancel(self, staff, day, slot):
+        """Free a booked slot (the last seat taken, for a group class); whether a booking was removed"""
+        day = day.isoformat() if isinstance(day, date) else day
+        return await self._submit(lambda conn: _cancel(conn, staff, day, slot))
+
+    def _read_bookings(self, since):
+        conn = _connect(self.path)
+        try:
+            return conn.execute(
+                "SELECT staff, date, slot FROM bookings WHERE date >= ? ORDER BY date, staff",
+                (since,)
+            ).fetchall()
+        finally:
+            conn.close()
+
+    async def bookings(self, since=None):
+        """(staff, date, slot) of every booking on or after a date (the clinic's today by default)"""
+        since = (since or clinic_today()).isoformat()
+        rows = await asyncio.to_thread(self._read_bookings, since)
+        return [(staff, date.fromisoformat(day), slot) for staff, day, slot in rows]
@@ -19,19 +19,20 @@ class DeepgramHandler:
         logger.debug(f"   API key length: {len(self.api_key)}")
         logger.debug("✅ DeepgramHandler initialized")
     
-    def _build_url(self):
+    def build_url(self):
         """Build Deepgram WebSocket URL with parameters"""
         logger.debug("🔗 Building Deepgram WebSocket URL")
-        # Match exactly what works in working_voice_assistant.py
+        # Same parameter set the live sessions have always used
         params = [
             f"encoding={self.config.encoding}",
             f"sample_rate={self.config.sample_rate}",
             f"channels={self.config.channels}",
             f"model={self.config.model}",
             f"language={self.config.language}",
-            f"punctuate={'true' if self.config.punctuate else 'false'}",
             f"interim_results={'true' if self.config.interim_results else 'false'}",
             f"endpointing={self.config.endpointing}",
+            f"smart_format={'true' if self.config.smart_format else 'false'}",
+            f"numerals={'true' if self.config.numerals else 'false'}",
         ]
         
         url = f"wss://api.deepgram.com/v1/listen?{'&'.join(params)}"
@@ -42,11 +43,10 @@ class DeepgramHandler:
     async def connect(self):
         """Connect to Deepgram WebSocket API"""
         logger.debug("🔌 Starting Deepgram connection process")
-        url = self._build_url()
+        url = self.build_url()
         
         logger.info("🔌 Connecting to Deepgram...")
-        logger.info(f"📍 URL: {url}")
-        logger.info(f"🔑 API Key (first 10 chars): {self.api_key[:10]}...")
+        logger.debug(f"   URL: {url}")
         logger.debug(f"   Full URL length: {len(url)} chars")
         logger.debug(f"   API key length: {len(self.api_key)} chars")
         
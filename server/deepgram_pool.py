@@ -0,0 +1,148 @@
+"""
+Deepgram Connection Pool
+
+Keeps pre-established Deepgram streaming sockets warm so a new browser
+connection can start streaming audio without waiting for DNS, TCP, TLS and
+the websocket upgrade.
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from loguru import logger
+
+from server.deepgram_handler import DeepgramHandler
+
+
+class DeepgramPool:
+    """Per-process pool of warm Deepgram sockets, one set per distinct DeepgramConfig parameter set"""
+
+    def __init__(self, size=2, keepalive_interval=5.0, max_idle=300.0):
+        logger.debug("🔧 Initializing DeepgramPool")
+        self.size = size
+        self.keepalive_interval = keepalive_interval
+        self.max_idle = max_idle
+        # key -> deque of (connection, opened_at)
+        self._idle = {}
+        self._handlers = {}
+        self._config_keys = {}  # id(config) -> (config, key)
+        self._refills = {}
+        self._keepalive_task = None
+        self.hits = 0
+        self.misses = 0
+        logger.debug(f"   Pool size: {size}, keepalive interval: {keepalive_interval}s, max idle: {max_idle}s")
+
+    def _key(self, deepgram_config):
+        """Pool key: the full listen URL plus the credentials it is opened with"""
+        # Resolved once per config object; acquire() runs on every browser connection
+        cached = self._config_keys.get(id(deepgram_config))
+        if cached is not None and cached[0] is deepgram_config:
+            return cached[1]
+        handler = DeepgramHandler(deepgram_config)
+        key = (handler.build_url(), deepgram_config.api_key)
+        self._handlers.setdefault(key, handler)
+        self._config_keys[id(deepgram_config)] = (deepgram_config, key)
+        return key
+
+    async def start(self, deepgram_config):
+        """Warm the pool for a parameter set and start the keepalive loop"""
+        if self.size <= 0:
+            logger.debug("   Deepgram pool disabled (size 0)")
+            return
+        key = self._key(deepgram_config)
+        if self._keepalive_task is None:
+            self._keepalive_task = asyncio.create_task(self._keepalive_loop())
+        await self._refill(key)
+        logger.info(f"🔥 Deepgram pool warmed ({len(self._idle.get(key, ()))} sockets)")
+
+    async def acquire(self, deepgram_config):
+        """Hand out a warm socket (or connect a fresh one) and replenish in the background"""
+        key = self._key(deepgram_config)
+        idle = self._idle.get(key)
+        connection = None
+        while idle:
+            candidate, _ = idle.popleft()
+            if candidate.open:
+                connection = candidate
+                break
+            logger.debug("   Discarding closed pooled Deepgram socket")
+
+        if self.size > 0:
+            self._schedule_refill(key)
+
+        if connection is not None:
+            self.hits += 1
+            logger.debug(f"♻️ Using warm Deepgram socket (hits: {self.hits}, misses: {self.misses})")
+            return connection
+
+        self.misses += 1
+        logger.debug(f"   No warm Deepgram socket available (hits: {self.hits}, misses: {self.misses})")
+        return await self._handlers[key].connect()
+
+    def _schedule_refill(self, key):
+        """Start a background refill unless one is already running"""
+        task = self._refills.get(key)
+        if task is None or task.done():
+            self._refills[key] = asyncio.create_task(self._refill(key))
+
+    async def _refill(self, key):
+        """Open sockets until the pool for this key is back to its target size"""
+        idle = self._idle.setdefault(key, deque())
+        while len(idle) < self.size:
+            try:
+                connection = await self._handlers[key].connect()
+            except Exception as e:
+                logger.error(f"❌ Deepgram pool refill failed: {e}")
+                return
+            idle.append((connection, time.monotonic()))
+            logger.debug(f"   Deepgram pool size: {len(idle)}/{self.size}")
+
+    async def _keepalive_loop(self):
+        """Keep idle sockets open and recycle the ones that are too old or dead"""
+        message = json.dumps({"type": "KeepAlive"})
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            now = time.monotonic()
+            for key, idle in list(self._idle.items()):
+                # Iterate over a snapshot: acquire() may pop sockets while we await sends
+                for entry in list(idle):
+                    connection, opened_at = entry
+                    if not connection.open or now - opened_at > self.max_idle:
+                        self._discard(idle, entry)
+                        continue
+                    try:
+                        await connection.send(message)
+                    except Exception as e:
+                        logger.debug(f"   KeepAlive failed, dropping pooled socket: {e}")
+                        self._discard(idle, entry)
+                if len(idle) < self.size:
+                    self._schedule_refill(key)
+
+    def _discard(self, idle, entry):
+        """Remove a socket from the idle set and close it in the background"""
+        if entry in idle:
+            idle.remove(entry)
+        asyncio.create_task(self._close(entry[0]))
+
+    async def _close(self, connection):
+        """Close a pooled socket, ignoring errors"""
+        try:
+            await connection.send(json.dumps({"type": "CloseStream"}))
+            await connection.close()
+        except Exception:
+            pass
+
+    async def close(self):
+        """Stop the keepalive loop and close every idle socket"""
+        tasks = [task for task in self._refills.values() if not task.done()]
+        if self._keepalive_task is not None:
+            tasks.append(self._keepalive_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for idle in self._idle.values():
+            while idle:
+                connection, _ = idle.popleft()
+                await self._close(connection)
+        logger.debug("✅ Deepgram pool closed")
@@ -0,0 +1,208 @@
+"""
+Fuzzy Name Index - STT-tolerant lookup of service and doctor names
+
+Speech-to-text splits and mangles names ("pilates" -> "pilot is", "Anjali
+Khanna" -> "and jolly car"). Every name, short name, treatment type and staff
+member in the KB (people also by given and family name alone) is indexed by the
+character trigrams of its letters (spaces removed, so word splits do not
+matter) and by a coarse phonetic key (sound-alike consonants merged, vowels
+dropped). A transcript is scanned span by span; the
+inverted indexes narrow each span to a handful of candidates before scoring.
+"""
+
+import re
+from collections import Counter, namedtuple
+from difflib import SequenceMatcher
+from functools import lru_cache
+from loguru import logger
+
+
+FuzzyMatch = namedtuple("FuzzyMatch", "score kind key name alias")
+
+NON_LETTERS_RE = re.compile(r"[^a-z]")
+WORD_RE = re.compile(r"[a-z]+")
+TITLE_RE = re.compile(r"^(dr|mr|mrs|ms)\.?\s+", re.IGNORECASE)
+DIGRAPHS = (("ph", "f"), ("kh", "k"), ("gh", "g"), ("sh", "s"), ("ch", "c"), ("th", "t"))
+PHONETIC_CODES = {
+    "b": "P", "p": "P", "f": "F", "v": "F",
+    "c": "K", "g": "K", "k": "K", "q": "K", "x": "KS",
+    "d": "T", "t": "T", "s": "S", "z": "S", "j": "J",
+    "l": "L", "r": "R", "m": "N", "n": "N",
+}  # a, e, i, o, u, h, w, y carry no code
+# Words a name never starts with, though STT may end a split name with one ("pilot is")
+FILLER_WORDS = frozenset(
+    "a an the is it i to for of in on at with my me book see want need like get have".split()
+)
+MIN_PHONETIC_LENGTH = 4  # Shorter keys ("yoga" -> "AK", "meeting" -> "NTN") collide too easily
+MIN_PHONETIC_OVERLAP = 0.4  # Key bigram overlap (Dice) before a sound-alike is worth comparing
+PHONETIC_WEIGHT = 0.9  # Sound-alikes count slightly less than spelling matches
+# Sound-alikes of treatments and specialties count less again ("arvind" is not "ayurveda")
+TERM_PHONETIC_WEIGHT = 0.8
+MAX_SPAN_WORDS = 3
+SPAN_CACHE_SIZE = 8192
+SCORE_FLOOR = 0.6  # Lowest min_score a search may ask for
+MIN_LENGTH_RATIO, MAX_LENGTH_RATIO = 0.6, 1.6  # Spans much longer or shorter than an alias are other words
+
+
+def compact(text):
+    """Letters only, lowercase: 'Pilot is' -> 'pilotis'"""
+    return NON_LETTERS_RE.sub("", text.lower())
+
+
+def trigrams(letters):
+    padded = f"^{letters}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def phonetic_key(letters):
+    """Coarse sound-alike key: 'andjollycar' -> 'ANTJLKR', 'anjalikhanna' -> 'ANJLKN'"""
+    for digraph, replacement in DIGRAPHS:
+        letters = letters.replace(digraph, replacement)
+    key = "A" if letters[:1] in ("a", "e", "i", "o", "u") else ""
+    for letter in letters:
+        code = PHONETIC_CODES.get(letter)
+        if code and not key.endswith(code):
+            key += code
+    return key
+
+
+@lru_cache(maxsize=4096)
+def _sound_ratio(key, other):
+    """Similarity of two phonetic keys (0-1)"""
+    return SequenceMatcher(None, key, other).ratio()
+
+
+def _bigrams(key):
+    return {key[i:i + 2] for i in range(len(key) - 1)}
+
+
+def _person_aliases(person):
+    """A person's name, without title, and their given and family names alone"""
+    if not person:
+        return []
+    bare = TITLE_RE.sub("", person)
+    return list(dict.fromkeys([person, bare] + bare.split()))
+
+
+def name_aliases(data):
+    """(kind, key, canonical name, alias, is_term) for everything a caller may name
+
+    Terms are treatments and specialties: descriptive words, not names.
+    """
+    aliases = []
+    for department in data.get('departments', {}).values():
+        for key, service in department.get('services', {}).items():
+            name = service.get('name', key)
+            names = [name, key.replace('_', ' '), service.get('short_name')]
+            names += _person_aliases(service.get('staff')) + _person_aliases(service.get('instructor'))
+            for alias in names:
+                if alias:
+                    aliases.append(("service", key, name, alias, False))
+            for alias in service.get('types', []):
+                aliases.append(("service", key, name, alias, True))
+    for key, doctor in data.get('doctors', {}).items():
+        name = doctor.get('name', key)
+        for alias in _person_aliases(name):
+            aliases.append(("doctor", key, name, alias, False))
+        for alias in [key.replace('_', ' '), doctor.get('short_name')] + doctor.get('specialization', []):
+            if alias:
+                aliases.append(("doctor", key, name, alias, True))
+    return aliases
+
+
+class FuzzyNameIndex:
+    """Ranked fuzzy matches of KB names in a transcript"""
+
+    def __init__(self, data, min_score=0.7):
+        self.min_score = min_score
+        self._entries = []  # (kind, key, name, alias)
+        self._lengths = []  # letters in the alias
+        self._gram_counts = []
+        self._phonetic = []
+        self._phonetic_weights = []
+        self._by_trigram = {}
+        self._by_phonetic = {}
+        self._exact = {}
+        for kind, key, name, alias, is_term in name_aliases(data):
+            letters = compact(alias)
+            if len(letters) < 3:
+                continue
+            index = len(self._entries)
+            grams = trigrams(letters)
+            phonetic = phonetic_key(letters)
+            self._entries.append((kind, key, name, alias))
+            self._lengths.append(len(letters))
+            self._gram_counts.append(len(grams))
+            self._phonetic.append(phonetic)
+            self._phonetic_weights.append(TERM_PHONETIC_WEIGHT if is_term else PHONETIC_WEIGHT)
+            self._exact.setdefault(letters, []).append(index)
+            for gram in grams:
+                self._by_trigram.setdefault(gram, []).append(index)
+            if len(phonetic) >= MIN_PHONETIC_LENGTH:
+                for gram in _bigrams(phonetic):
+                    self._by_phonetic.setdefault(gram, []).append(index)
+        self._max_length = max(self._lengths, default=0)
+        # Callers repeat the same words ("tomorrow", "appointment"), so span results are memoized
+        self._scored = lru_cache(maxsize=SPAN_CACHE_SIZE)(self._scored)
+        logger.debug(f"🔧 FuzzyNameIndex: {len(self._entries)} aliases, {len(self._by_trigram)} trigrams, {len(self._by_phonetic)} phonetic bigrams")
+
+    def _spans(self, text):
+        """Letter strings of every run of 1-3 words that does not start with a filler word"""
+        words = WORD_RE.findall(text.lower())
+        for start, word in enumerate(words):
+            if word in FILLER_WORDS:
+                continue
+            letters = ""
+            for end in range(start, min(start + MAX_SPAN_WORDS, len(words))):
+                letters += words[end]
+                if len(letters) > self._max_length * MAX_LENGTH_RATIO:
+                    break
+                if len(letters) >= 3:
+                    yield letters
+
+    def _scored(self, letters):
+        """(score, entry index) of the aliases a span resembles"""
+        exact = self._exact.get(letters)
+        if exact:
+            return [(1.0, index) for index in exact]
+        grams = trigrams(letters)
+        hits = Counter(index for gram in grams for index in self._by_trigram.get(gram, ()))
+        phonetic = phonetic_key(letters)
+        sound_grams = _bigrams(phonetic) if len(phonetic) >= MIN_PHONETIC_LENGTH else ()
+        sound_hits = Counter(index for gram in sound_grams for index in self._by_phonetic.get(gram, ()))
+        # Spans much longer or shorter than an alias are other words
+        shortest = len(letters) / MAX_LENGTH_RATIO
+        longest = len(letters) / MIN_LENGTH_RATIO
+        scores = {}
+        for index, count in hits.items():
+            if shortest <= self._lengths[index] <= longest:
+                score = 2 * count / (len(grams) + self._gram_counts[index])
+                if score >= SCORE_FLOOR:
+                    scores[index] = score
+        for index, count in sound_hits.items():
+            if index in scores or not shortest <= self._lengths[index] <= longest:
+                continue
+            entry_phonetic = self._phonetic[index]
+            # Sound-alikes must start with the same sound; STT rarely garbles a name's onset
+            if (phonetic[0] == entry_phonetic[0]
+                    and 2 * count / (len(sound_grams) + len(entry_phonetic) - 1) >= MIN_PHONETIC_OVERLAP):
+                score = self._phonetic_weights[index] * _sound_ratio(phonetic, entry_phonetic)
+                if score >= SCORE_FLOOR:
+                    scores[index] = score
+        return [(score, index) for index, score in scores.items()]
+
+    def search(self, text, kind=None, limit=3, min_score=None):
+        """Best FuzzyMatch per entity found in the text, highest score first"""
+        min_score = max(self.min_score if min_score is None else min_score, SCORE_FLOOR)
+        best = {}
+        for letters in set(self._spans(text)):
+            for score, index in self._scored(letters):
+                entry_kind, key, name, alias = self._entries[index]
+                score = round(score, 3)  # 0.8 * 1.0 must not fall short of a 0.8 threshold
+                if score < min_score or (kind is not None and entry_kind != kind):
+                    continue
+                previous = best.get((entry_kind, key))
+                if previous is None or (score, len(alias)) > (previous.score, len(previous.alias)):
+                    best[(entry_kind, key)] = FuzzyMatch(score, entry_kind, key, name, alias)
+        # On a tie the longer, more specific alias wins ("laser hair removal" over "hair")
+        return sorted(best.values(), key=lambda match: (-match.score, -len(match.alias)))[:limit]
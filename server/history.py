@@ -0,0 +1,121 @@
+"""
+Conversation History - Bounded per-session history with token budgeting
+
+The prompt view (recent turns, rolling summary, session notes) is maintained
+incrementally as messages are appended, so building the LLM request costs the
+same on turn 50 as on turn 2.
+"""
+
+import math
+from collections import deque
+from loguru import logger
+
+
+CHARS_PER_TOKEN = 4  # Rough average for English text with the GPT-4o tokenizers
+MESSAGE_OVERHEAD_TOKENS = 4  # Role and separators of one chat message
+SUMMARY_LINE_CHARS = 160
+MAX_NOTES = 8
+
+
+def estimate_tokens(text):
+    """Approximate token count of a text"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def message_tokens(message):
+    """Approximate token cost of one chat message"""
+    return estimate_tokens(message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS
+
+
+def _summary_line(message):
+    """One extractive summary line: the first sentence of a turn, clipped"""
+    content = " ".join((message.get("content") or "").split())
+    for terminator in (". ", "? ", "! "):
+        index = content.find(terminator)
+        if index != -1:
+            content = content[:index + 1]
+    if len(content) > SUMMARY_LINE_CHARS:
+        content = content[:SUMMARY_LINE_CHARS].rsplit(" ", 1)[0] + "..."
+    speaker = "Caller" if message["role"] == "user" else "Assistant"
+    return f"- {speaker}: {content}"
+
+
+class ConversationHistory:
+    """Recent turns within a token budget, with older turns compacted into a rolling summary"""
+
+    def __init__(self, token_budget=1200, summary_max_tokens=200, min_recent_messages=4):
+        self.token_budget = token_budget
+        self.summary_max_tokens = summary_max_tokens
+        self.min_recent_messages = min_recent_messages
+        self._recent = deque()  # (message, tokens) of the user/assistant turns sent to the LLM
+        self.recent_tokens = 0
+        self._summary_lines = deque()  # (line, tokens), oldest first
+        self.summary_tokens = 0
+        self._summary_text = None
+        # Session-specific system notes (e.g. the greeting reminder), not part of the turn view
+        self.notes = deque(maxlen=MAX_NOTES)
+        self.last_user_text = ""
+        self.message_count = 0
+        self.compacted_count = 0
+
+    def __len__(self):
+        return self.message_count
+
+    def __iter__(self):
+        """Recent turns, oldest first"""
+        return (message for message, _ in self._recent)
+
+    def append(self, message):
+        """Record a message and keep the prompt view within the token budget"""
+        self.message_count += 1
+        if message["role"] == "system":
+            self.notes.append(message)
+            return
+        if message["role"] == "user":
+            self.last_user_text = message["content"]
+        tokens = message_tokens(message)
+        self._recent.append((message, tokens))
+        self.recent_tokens += tokens
+        self._compact()
+
+    def _compact(self):
+        """Fold the oldest turns into the summary until the view fits the budget"""
+        compacted = 0
+        while (self.recent_tokens + self.summary_tokens > self.token_budget
+               and len(self._recent) > self.min_recent_messages):
+            message, tokens = self._recent.popleft()
+            self.recent_tokens -= tokens
+            line = _summary_line(message)
+            line_tokens = estimate_tokens(line) + 1
+            self._summary_lines.append((line, line_tokens))
+            self.summary_tokens += line_tokens
+            compacted += 1
+        if not compacted:
+            return
+        # The summary rolls: its oldest lines fall off once it outgrows its own cap
+        while len(self._summary_lines) > 1 and self.summary_tokens > self.summary_max_tokens:
+            _, line_tokens = self._summary_lines.popleft()
+            self.summary_tokens -= line_tokens
+        self._summary_text = None
+        self.compacted_count += compacted
+        logger.debug(f"🗜️ Compacted {compacted} turns into the summary ({self.prompt_tokens} prompt tokens, {len(self._recent)} recent turns)")
+
+    @property
+    def summary_text(self):
+        """Rolling summary of the compacted turns, or None before any compaction"""
+        if self._summary_text is None and self._summary_lines:
+            self._summary_text = "\n".join(line for line, _ in self._summary_lines)
+        return self._summary_text
+
+    @property
+    def prompt_tokens(self):
+        """Approximate tokens of the conversation part of the prompt (summary + recent turns)"""
+        return self.summary_tokens + self.recent_tokens
+
+    def turns(self):
+        """Recent user/assistant turns to send to the LLM"""
+        return [message for message, _ in self._recent]
+
+    def note_texts(self):
+        """Contents of the session notes, oldest first"""
+        return [note["content"] for note in self.notes]
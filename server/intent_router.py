@@ -0,0 +1,102 @@
+"""
+Intent Router - Zero-LLM fast path for FAQ intents
+
+Answers high-confidence questions about opening hours, location and contact
+details straight from the knowledge base (conversation_hints.common_questions).
+"""
+
+import re
+from loguru import logger
+
+
+# Order matters: answers are joined in this order when several intents match
+INTENT_PATTERNS = {
+    "hours": re.compile(
+        r"\b(opening hours|working hours|business hours|your hours|(clinic|your|opening) timings?|"
+        r"what time do you (open|close)|when (do|are) you (open|close)|"
+        r"are you open|(open|close) (on|at|today|tomorrow|sunday|saturday))\b"
+    ),
+    "location": re.compile(
+        r"\b(where are you|where is (the )?(clinic|center|centre)|where('s| is) levo|"
+        r"your (address|location)|what is the address)\b"
+    ),
+    "phone": re.compile(
+        r"\b(phone number|contact number|your number|number to call|call you|"
+        r"how (do|can) i (call|contact|reach) you)\b"
+    ),
+    "whatsapp": re.compile(r"\bwhats ?app\b"),
+    "email": re.compile(r"\b(e-?mail|mail you)\b"),
+}
+
+# Anything that needs reasoning or a booking flow goes to the LLM
+LLM_ONLY_PATTERN = re.compile(
+    r"\b(book|booking|appointment|slot|available|availability|price|cost|fee|how much|"
+    r"cancel|reschedule|doctor|dr)\b"
+)
+
+MAX_WORDS = 16
+
+
+class IntentRouter:
+    """Matches FAQ intents in a transcript and answers them from the KB"""
+
+    def __init__(self, kb):
+        logger.debug("🔧 Initializing IntentRouter")
+        self.find_services = kb.find_services
+        self.answers = self._build_answers(kb)
+        logger.debug(f"   FAQ intents available: {list(self.answers.keys())}")
+
+    def _build_answers(self, kb):
+        """Compile the canned answers once from the KB"""
+        common = kb.data.get('conversation_hints', {}).get('common_questions', {})
+        contact = kb.get_contact_info()
+        answers = {}
+
+        hours = common.get('hours')
+        if not hours:
+            operating_hours = kb.get_operating_hours()
+            if operating_hours:
+                hours = "We're open " + ", ".join(
+                    f"{days.replace('_', ' ').title()} {time}" for days, time in operating_hours.items()
+                ) + "."
+        if hours:
+            answers["hours"] = hours
+
+        location = common.get('location') or kb.data.get('clinic_info', {}).get('location')
+        if location:
+            answers["location"] = f"We're in {location}." if not location.endswith('.') else location
+
+        phone = common.get('phone') or contact.get('main_phone')
+        if phone:
+            answers["phone"] = f"You can call us on {phone}."
+
+        whatsapp = contact.get('whatsapp')
+        if whatsapp:
+            answers["whatsapp"] = f"You can WhatsApp us on {whatsapp}."
+
+        email = contact.get('email')
+        if email:
+            answers["email"] = f"You can email us at {email}."
+        return answers
+
+    def route(self, transcript):
+        """Return (intents, answer) for a high-confidence FAQ question, or None"""
+        text = transcript.lower().strip()
+        if not text or len(text.split()) > MAX_WORDS:
+            return None
+        if LLM_ONLY_PATTERN.search(text):
+            return None
+        # "What are the yoga timings?" is about a service's schedule, not the clinic's hours
+        if self.find_services(text):
+            return None
+
+        intents = [
+            intent for intent, pattern in INTENT_PATTERNS.items()
+            if intent in self.answers and pattern.search(text)
+        ]
+        if not intents:
+            return None
+
+        answer = " ".join(self.answers[intent] for intent in intents)
+        logger.debug(f"⚡ FAQ intents matched: {intents}")
+        return intents, answer
@@ -0,0 +1,271 @@
+"""
+KB Tools - Function tools the LLM calls instead of guessing from the prompt
+
+Availability, prices, services and opening hours are looked up in the KB and
+the availability engine of the current snapshot; bookings go through the
+caller-supplied booking coroutine (the durable ledger). Every tool call the
+model makes in one response is answered in the same round trip.
+"""
+
+import asyncio
+import inspect
+import json
+from loguru import logger
+
+from server.availability import normalize_slot, resolve_date
+
+
+MAX_ALTERNATIVES = 3
+MAX_CANDIDATES = 3
+
+TOOL_SCHEMAS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "check_doctor_availability",
+            "description": "Free appointment slots of a doctor or a service on a day. Call it before saying anything about availability.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "name": {
+                        "type": "string",
+                        "description": "Doctor specialty (dermatologist, ayurveda, nutritionist, pain relief) or service (spa, hair, nail, skin, yoga, pilates, meditation, ...)"
+                    },
+                    "day": {"type": "string", "description": "today, tomorrow, a weekday name or YYYY-MM-DD"},
+                    "time": {"type": "string", "description": "Requested time, e.g. '3 PM' (omit to list the free slots)"},
+                    "window": {"type": "string", "enum": ["morning", "afternoon", "evening"]}
+                },
+                "required": ["name", "day"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_price",
+            "description": "Price range of a service or consultation fee of a doctor, in rupees. Only call it when the caller asks about cost.",
+            "parameters": {
+                "type": "object",
+                "properties": {"name": {"type": "string", "description": "Service or doctor specialty"}},
+                "required": ["name"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "find_service",
+            "description": "Services matching what the caller described (e.g. 'massage', 'facial', 'weight loss'), with their treatments and duration. 'did_you_mean' names are only guesses at a misheard name: confirm with the caller before using one.",
+            "parameters": {
+                "type": "object",
+                "properties": {"query": {"type": "string"}},
+                "required": ["query"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_operating_hours",
+            "description": "Clinic opening hours.",
+            "parameters": {"type": "object", "properties": {}}
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "book_appointment",
+            "description": "Book a slot once the caller has confirmed it and given their name and phone number. Only confirm the booking if the result says booked.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string", "description": "Doctor specialty or service, as for check_doctor_availability"},
+                    "day": {"type": "string", "description": "today, tomorrow, a weekday name or YYYY-MM-DD"},
+                    "time": {"type": "string", "description": "Slot time, e.g. '3 PM'"},
+                    "caller_name": {"type": "string"},
+                    "phone": {"type": "string"}
+                },
+                "required": ["name", "day", "time", "caller_name", "phone"]
+            }
+        }
+    },
+]
+
+
+def merge_tool_call_delta(tool_calls, fragment):
+    """Accumulate one streamed tool call fragment into OpenAI-format tool call dicts"""
+    while len(tool_calls) <= fragment.index:
+        tool_calls.append({"id": "", "type": "function", "function": {"name": "", "arguments": ""}})
+    call = tool_calls[fragment.index]
+    if fragment.id:
+        call["id"] = fragment.id
+    if fragment.function is not None:
+        if fragment.function.name:
+            call["function"]["name"] += fragment.function.name
+        if fragment.function.arguments:
+            call["function"]["arguments"] += fragment.function.arguments
+
+
+class KBTools:
+    """Executes the LLM's tool calls against one KB snapshot"""
+
+    def __init__(self, kb, availability):
+        self.kb = kb
+        self.availability = availability
+        self._doctors = kb.data.get('doctors', {})
+        self._service_keywords = kb.data.get('conversation_hints', {}).get('service_keywords', {})
+        self._handlers = {
+            "check_doctor_availability": self.check_doctor_availability,
+            "get_price": self.get_price,
+            "find_service": self.find_service,
+            "get_operating_hours": self.get_operating_hours,
+            "book_appointment": self.book_appointment,
+        }
+
+    def _entity(self, name):
+        """Availability entity key for a specialty, service type, short name or keyword"""
+        name = name.strip().lower()
+        key = self.availability.entity(name)
+        if key is None and name in self._service_keywords:
+            key = self.availability.entity(self._service_keywords[name])
+        if key is None:
+            found = self.kb.get_doctor(name) or self.kb.find_service(name)
+            if found is not None:
+                key = self.availability.entity(found.get('short_name') or '')
+        return key
+
+    def _label(self, key):
+        """'Dr. Arvind Singh (Pain Relief)' for doctors, the service name otherwise"""
+        doctor = self._doctors.get(key)
+        if doctor is not None:
+            return f"{doctor['name']} ({key.replace('_', ' ').title()})"
+        service = self.kb.get_service_by_type(key)
+        return service.get('name', key) if service else key
+
+    @staticmethod
+    def _date(day):
+        """Date for a spoken day, or None if it cannot be read ("next monday")"""
+        try:
+            return resolve_date(day)
+        except ValueError:
+            return None
+
+    # Tools
+
+    def check_doctor_availability(self, name, day, time=None, window=None):
+        key = self._entity(name)
+        if key is None:
+            return {"error": f"No doctor or service called '{name}'"}
+        when = self._date(day)
+        if when is None:
+            return {"error": f"Could not read the day '{day}'"}
+        result = {"with": self._label(key), "date": when.strftime("%A, %B %d")}
+        if time:
+            slot = normalize_slot(time)
+            if slot is None:
+                return {"error": f"Could not read the time '{time}'"}
+            result["time"] = slot
+            result["available"] = self.availability.is_free(key, when, slot)
+            if result["available"]:
+                return result
+        free = self.availability.free_slots(key, when, window)
+        if not time:
+            result["available"] = bool(free)
+            result["free_slots"] = free
+        elif free:
+            result["alternatives"] = free[:MAX_ALTERNATIVES]
+        if not free:
+            earliest = self.availability.earliest_free(key, when, window)
+            if earliest is not None:
+                next_day, next_slot = earliest
+                result["next_available"] = f"{next_day.strftime('%A, %B %d')} at {next_slot}"
+        return result
+
+    def get_price(self, name):
+        price = self.kb.get_price(name)
+        if price is None:
+            key = self._entity(name)
+            price = self.kb.get_price(key.replace('_', ' ')) if key else None
+        if price is None:
+            return {"error": f"No price found for '{name}'"}
+        return {"name": name, "currency": "INR", **price}
+
+    def find_service(self, query):
+        services = self.kb.find_services(query)
+        # Keywords may point to a doctor ("weight" -> nutritionist)
+        doctors = [self._doctors[specialty] for specialty in self.kb.find_doctors(query)]
+        if not doctors and not services:
+            doctor = self.kb.get_doctor(query.strip().lower())
+            doctors = [doctor] if doctor is not None else []
+        matches = [
+            {
+                "name": service.get('name'),
+                "treatments": service.get('types', []),
+                "duration": service.get('duration'),
+            }
+            for service in services
+        ]
+        for doctor in doctors:
+            matches.append({"name": doctor['name'], "specialization": doctor.get('specialization', [])})
+        if matches:
+            return {"matches": matches}
+        result = {"error": f"No service matches '{query}'"}
+        # Misheard names ("pilot is") are offered for the caller to confirm, never resolved here
+        candidates = list(dict.fromkeys(match.name for match in self.kb.find_names(query, limit=MAX_CANDIDATES)))
+        if candidates:
+            result["did_you_mean"] = candidates
+        return result
+
+    def get_operating_hours(self):
+        return {"hours": self.kb.get_operating_hours()}
+
+    async def book_appointment(self, name, day, time, caller_name, phone, book=None):
+        key = self._entity(name)
+        if key is None:
+            return {"error": f"No doctor or service called '{name}'"}
+        when = self._date(day)
+        if when is None:
+            return {"error": f"Could not read the day '{day}'"}
+        slot = normalize_slot(time)
+        if slot is None:
+            return {"error": f"Could not read the time '{time}'"}
+        if book is None:
+            return {"error": "Booking is not available right now"}
+        confirmation = await book(key, when, slot, caller_name, phone)
+        if confirmation is not None:
+            return {"booked": True, "confirmation": confirmation}
+        result = {"booked": False, "with": self._label(key), "date": when.strftime("%A, %B %d"), "time": slot}
+        free = self.availability.free_slots(key, when)
+        if free:
+            result["alternatives"] = free[:MAX_ALTERNATIVES]
+        return result
+
+    # Execution
+
+    async def _call(self, tool_call, book):
+        """Run one tool call; errors become a result the model can read"""
+        function = tool_call["function"]
+        handler = self._handlers.get(function["name"])
+        try:
+            if handler is None:
+                raise ValueError(f"Unknown tool '{function['name']}'")
+            arguments = json.loads(function["arguments"] or "{}")
+            if handler == self.book_appointment:
+                arguments["book"] = book
+            result = handler(**arguments)
+            if inspect.isawaitable(result):
+                result = await result
+        except Exception as e:
+            # Malformed arguments ("time": 15) must not end the turn
+            result = {"error": str(e)}
+        logger.info(f"🛠️ {function['name']}({function['arguments']}) -> {result}")
+        return {"role": "tool", "tool_call_id": tool_call["id"], "content": json.dumps(result, ensure_ascii=False)}
+
+    async def run(self, tool_calls, book=None):
+        """Tool result messages for every call of one model response, in call order
+
+        `book(key, date, slot, name, phone)` reserves a slot and returns the
+        confirmation text, or None if the slot is taken.
+        """
+        # Lookups finish in microseconds; concurrent bookings share one ledger write batch
+        return await asyncio.gather(*(self._call(tool_call, book) for tool_call in tool_calls))
@@ -0,0 +1,117 @@
+"""
+KB Watcher - Hot reload of knowledge_base.json
+
+Polls the file's mtime and size, parses, validates and indexes a changed KB in
+a worker thread, then swaps the new snapshot in with a single assignment on
+the event loop.
+"""
+
+import asyncio
+import json
+import os
+from loguru import logger
+
+from config.prompts import PromptBuilder
+from config.settings import config
+from server.availability import AvailabilityEngine
+from server.intent_router import IntentRouter
+from server.kb_tools import KBTools
+from server.knowledge_base import LevoWellnessSmartKB, validate_kb_data
+from server.reply_rules import ReplyRules
+from server.retrieval import KBRetriever
+
+
+SETTLE_DELAY = 0.2  # Seconds a changed file must stay unchanged before it is read
+
+
+class KBSnapshot:
+    """A loaded KB with everything derived from it; never mutated once built"""
+
+    def __init__(self, kb, prompt_variant, version=1):
+        self.kb = kb
+        self.version = version
+        self.intent_router = IntentRouter(kb)
+        self.reply_rules = ReplyRules(kb)
+        self.availability = AvailabilityEngine(kb)
+        self.tools = KBTools(kb, self.availability)
+        self.retriever = KBRetriever(
+            kb,
+            top_k=config.openai.retrieval_top_k,
+            token_cap=config.openai.retrieval_token_cap
+        )
+        # KB facts reach the LLM per turn (retriever, tools), so the static prefix carries none
+        self.prompt = PromptBuilder(variant=prompt_variant)
+
+
+def load_snapshot(path, prompt_variant, version):
+    """Parse, validate and index a KB file (blocking, runs off the event loop)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    validate_kb_data(data)
+    return KBSnapshot(LevoWellnessSmartKB(data_path=path, data=data), prompt_variant, version)
+
+
+def file_signature(path):
+    """(mtime_ns, size) of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class KBWatcher:
+    """Detects changes to the KB file and hands validated snapshots to on_swap"""
+
+    def __init__(self, path, prompt_variant, on_swap, interval=2.0, version=1):
+        self.path = path
+        self.prompt_variant = prompt_variant
+        self.on_swap = on_swap
+        self.interval = interval
+        self.version = version
+        self.reloads = 0
+        self.rejected = 0
+        self._signature = file_signature(path)
+        self._task = None
+
+    def start(self):
+        """Start polling in the background"""
+        if self.interval <= 0:
+            logger.debug("   KB hot reload disabled")
+            return
+        self._task = asyncio.create_task(self._watch())
+        logger.debug(f"👀 Watching {self.path} for changes every {self.interval}s")
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            signature = file_signature(self.path)
+            if signature is None or signature == self._signature:
+                continue
+            # Let an in-progress write finish before reading
+            await asyncio.sleep(SETTLE_DELAY)
+            if file_signature(self.path) != signature:
+                continue
+            self._signature = signature
+            await self.reload()
+
+    async def reload(self):
+        """Load the KB file now and swap it in if it is valid"""
+        version = self.version + 1
+        try:
+            snapshot = await asyncio.to_thread(load_snapshot, self.path, self.prompt_variant, version)
+        except Exception as e:
+            self.rejected += 1
+            logger.error(f"❌ KB reload rejected, keeping version {self.version}: {e}")
+            return None
+        self.version = version
+        self.reloads += 1
+        self.on_swap(snapshot)
+        return snapshot
+
+    async def close(self):
+        """Stop polling"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
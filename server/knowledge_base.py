@@ -9,6 +9,46 @@ import os
 from datetime import datetime
 from loguru import logger
 
+from server.fuzzy_index import TITLE_RE, FuzzyNameIndex
+from server.phrase_matcher import PhraseMatcher
+
+
+def _check(condition, message):
+    if not condition:
+        raise ValueError(message)
+
+
+def _validate_schedule(path, entity):
+    days = entity.get('available_days', [])
+    _check(isinstance(days, list) and all(isinstance(day, str) for day in days), f"{path}.available_days must be a list of day names")
+    slots = entity.get('slots', {})
+    _check(isinstance(slots, dict), f"{path}.slots must map days to slot lists")
+    for day, day_slots in slots.items():
+        _check(isinstance(day_slots, list), f"{path}.slots.{day} must be a list")
+
+
+def validate_kb_data(data):
+    """Raise ValueError if parsed KB data is not usable (used before hot-swapping a KB)"""
+    _check(isinstance(data, dict), "KB root must be an object")
+    departments = data.get('departments', {})
+    _check(isinstance(departments, dict), "departments must be an object")
+    for department_key, department in departments.items():
+        services = department.get('services') if isinstance(department, dict) else None
+        _check(isinstance(services, dict), f"departments.{department_key}.services must be an object")
+        for service_key, service in services.items():
+            path = f"departments.{department_key}.services.{service_key}"
+            _check(isinstance(service, dict) and service.get('name'), f"{path} needs a name")
+            _validate_schedule(path, service)
+            capacity = service.get('capacity', 1)
+            _check(isinstance(capacity, int) and capacity >= 1, f"{path}.capacity must be a positive integer")
+    doctors = data.get('doctors', {})
+    _check(isinstance(doctors, dict), "doctors must be an object")
+    for specialty, doctor in doctors.items():
+        _check(isinstance(doctor, dict) and doctor.get('name'), f"doctors.{specialty} needs a name")
+        _validate_schedule(f"doctors.{specialty}", doctor)
+    keywords = data.get('conversation_hints', {}).get('service_keywords', {})
+    _check(isinstance(keywords, dict), "conversation_hints.service_keywords must be an object")
+
 
 class LevoWellnessSmartKB:
     """
@@ -16,11 +56,13 @@ class LevoWellnessSmartKB:
     Only provides information when asked, supports natural dialogue flow
     """
     
-    def __init__(self, data_path="knowledge_base.json"):
+    def __init__(self, data_path="knowledge_base.json", data=None):
         logger.debug(f"🔧 Initializing LevoWellnessSmartKB")
         logger.debug(f"   Data path: {data_path}")
         self.data_path = data_path
-        self.data = self._load_data()
+        # Pre-parsed (and validated) data is passed in by the hot-reload watcher
+        self.data = self._load_data() if data is None else data
+        self._build_indexes()
         logger.debug(f"✅ LevoWellnessSmartKB initialized")
 
     def _load_data(self):
@@ -49,6 +91,78 @@ class LevoWellnessSmartKB:
             logger.exception("   Full exception traceback:")
             return {}
 
+    def _build_indexes(self):
+        """Build the O(1) lookup tables once per load"""
+        # type / short name -> service (first department wins, in KB order)
+        self._services = {}
+        # specialty / short name -> specialty key
+        self._doctors = {}
+        # price lookups also accept single words of a doctor's specialty ("pain" -> pain relief)
+        self._doctor_words = {}
+        # doctor's name, without title, given or family name -> specialty key (exact spelling only)
+        self._doctor_names = {}
+        # entity key -> frozenset of days, (entity key, day) -> ordered slots and slot set
+        self._available_days = {}
+        self._slot_lists = {}
+        self._slot_sets = {}
+
+        for department in self.data.get('departments', {}).values():
+            for service_type, service in department.get('services', {}).items():
+                for alias in self._aliases(service_type, service.get('short_name')):
+                    self._services.setdefault(alias, service)
+                self._index_schedule(service_type, service)
+
+        ambiguous_words = set()
+        ambiguous_names = set()
+        for specialty, doctor in self.data.get('doctors', {}).items():
+            bare = TITLE_RE.sub("", doctor.get('name', '')).lower()
+            for name in [bare] + bare.split():
+                if self._doctor_names.setdefault(name, specialty) != specialty:
+                    ambiguous_names.add(name)
+            aliases = self._aliases(specialty, doctor.get('short_name'))
+            for alias in aliases:
+                self._doctors.setdefault(alias, specialty)
+                for word in alias.split():
+                    if self._doctor_words.setdefault(word, specialty) != specialty:
+                        ambiguous_words.add(word)
+            self._index_schedule(specialty, doctor)
+        for word in ambiguous_words:
+            del self._doctor_words[word]
+        for name in ambiguous_names:
+            del self._doctor_names[name]
+
+        # Whole-word keyword automaton for find_service (plural forms included)
+        self._keyword_matcher = PhraseMatcher(word_boundaries=True)
+        keywords = self.data.get('conversation_hints', {}).get('service_keywords', {})
+        for keyword, service_type in keywords.items():
+            keyword = keyword.lower()
+            self._keyword_matcher.add(keyword, service_type)
+            if not keyword.endswith('s'):
+                self._keyword_matcher.add(f"{keyword}s", service_type)
+        self._keyword_matcher.build()
+
+        # Trigram + phonetic name index for STT-mangled names ("pilot is" -> Pilates)
+        self._fuzzy = FuzzyNameIndex(self.data)
+
+        logger.debug(f"   Indexed {len(self._services)} service keys, {len(self._doctors)} doctor keys, {len(self._slot_sets)} schedules")
+
+    @staticmethod
+    def _aliases(key, short_name=None):
+        """Lookup keys for an entity: its key, the key with spaces, and its short name"""
+        aliases = [key, key.replace('_', ' ')]
+        if short_name:
+            aliases.append(short_name.lower())
+        return list(dict.fromkeys(aliases))
+
+    def _index_schedule(self, key, entity):
+        """Index available days and per-day slots of a service or doctor"""
+        self._available_days[key] = frozenset(day.lower() for day in entity.get('available_days', []))
+        slots = entity.get('slots', {})
+        if isinstance(slots, dict):
+            for day, day_slots in slots.items():
+                self._slot_lists[(key, day.lower())] = list(day_slots)
+                self._slot_sets[(key, day.lower())] = frozenset(day_slots)
+
     def get_greeting(self, mode="voice_nano"):
         """Get ultra-minimal greeting (default: shortest)"""
         logger.debug(f"📝 get_greeting called with mode: {mode}")
@@ -66,60 +180,88 @@ class LevoWellnessSmartKB:
         Returns: service info or None
         """
         logger.debug(f"🔍 find_service called with query: '{query}'")
-        query_lower = query.lower()
-        keywords = self.data.get('conversation_hints', {}).get('service_keywords', {})
-        logger.debug(f"   Available service keywords: {list(keywords.keys())}")
-        
-        # Check keywords
-        for keyword, service_type in keywords.items():
-            if keyword in query_lower:
+        services = self.find_services(query)
+        if not services:
+            # Misheard names are only candidates (find_names); they never resolve silently
+            logger.debug(f"   No service found for query: '{query}'")
+            return None
+        logger.debug(f"   Service found: {services[0].get('name')}")
+        return services[0]
+
+    def find_services(self, query):
+        """
+        Every service mentioned in a query, in one pass over it
+        Whole words only; longer keywords win over the shorter ones they contain
+        Returns: list of service info, longest match first
+        """
+        services = []
+        for keyword, service_type in self._keyword_targets(query):
+            service = self.get_service_by_type(service_type)
+            if service is not None and all(service is not found for found in services):
                 logger.debug(f"   Matched keyword: '{keyword}' -> service_type: '{service_type}'")
-                service = self.get_service_by_type(service_type)
-                logger.debug(f"   Service found: {service.get('name') if service else None}")
-                return service
-        
-        logger.debug(f"   No service found for query: '{query}'")
-        return None
+                services.append(service)
+        return services
+
+    def find_doctors(self, query):
+        """
+        Every doctor a service keyword in the query points to ("weight" -> nutritionist)
+        Returns: list of specialty keys, longest match first
+        """
+        specialties = []
+        for keyword, target in self._keyword_targets(query):
+            specialty = self._doctors.get(target)
+            if specialty is not None and specialty not in specialties:
+                logger.debug(f"   Matched keyword: '{keyword}' -> specialty: '{specialty}'")
+                specialties.append(specialty)
+        return specialties
+
+    def _keyword_targets(self, query):
+        """(keyword, target) of the non-overlapping service keywords in a query, longest first"""
+        matches = sorted(
+            self._keyword_matcher.finditer(query.lower()),
+            key=lambda match: (match[0] - match[1], match[0])
+        )
+        taken = []
+        for start, end, target in matches:
+            if any(start < other_end and other_start < end for other_start, other_end in taken):
+                continue
+            taken.append((start, end))
+            yield query[start:end], target
+
+    def find_names(self, text, kind=None, limit=3, min_score=None):
+        """
+        Services and doctors named in a transcript, tolerating STT errors
+        Candidates for the caller or the LLM to confirm, never a lookup result
+        Returns: list of FuzzyMatch(score, kind, key, name, alias), best first
+        """
+        return self._fuzzy.search(text, kind=kind, limit=limit, min_score=min_score)
 
     def get_service_by_type(self, service_type):
         """Get service details by type (spa, hair, yoga, etc.)"""
         logger.debug(f"🔍 get_service_by_type called with service_type: '{service_type}'")
-        departments = self.data.get('departments', {})
-        logger.debug(f"   Available departments: {list(departments.keys())}")
-        
-        # Search in Salon department
-        salon = departments.get('salon', {}).get('services', {})
-        if service_type in salon:
-            logger.debug(f"   Found service in Salon department")
-            return salon[service_type]
-        
-        # Search in Aesthetics department
-        aesthetics = departments.get('aesthetics', {}).get('services', {})
-        if service_type in aesthetics:
-            logger.debug(f"   Found service in Aesthetics department")
-            return aesthetics[service_type]
-        
-        # Search in Wellness department
-        wellness = departments.get('wellness', {}).get('services', {})
-        if service_type in wellness:
-            logger.debug(f"   Found service in Wellness department")
-            return wellness[service_type]
-        
-        logger.debug(f"   Service type '{service_type}' not found in any department")
-        return None
+        service = self._services.get(service_type) or self._services.get(service_type.lower())
+        if service is None:
+            logger.debug(f"   Service type '{service_type}' not found in any department")
+        return service
 
     def get_doctor(self, specialty):
         """Get doctor info by specialty"""
         logger.debug(f"👨‍⚕️ get_doctor called with specialty: '{specialty}'")
-        doctors = self.data.get('doctors', {})
-        logger.debug(f"   Available doctor specialties: {list(doctors.keys())}")
-        doctor = doctors.get(specialty, None)
+        key = self._doctor_key(specialty)
+        doctor = self.data['doctors'][key] if key else None
         if doctor:
             logger.debug(f"   Found doctor: {doctor.get('name', 'Unknown')}")
         else:
             logger.debug(f"   No doctor found for specialty: '{specialty}'")
         return doctor
 
+    def _doctor_key(self, specialty):
+        """Specialty key for a specialty, short name or doctor's name ("Dr. Arvind", "arvind singh")"""
+        key = self._doctors.get(specialty) or self._doctors.get(specialty.lower())
+        if key is None:
+            key = self._doctor_names.get(TITLE_RE.sub("", specialty.strip()).lower())
+        return key
+
     def check_doctor_availability(self, specialty, day, time=None):
         """
         Check if doctor is available on a specific day/time
@@ -130,33 +272,27 @@ class LevoWellnessSmartKB:
         if not doctor:
             logger.debug(f"   Doctor not found for specialty: '{specialty}'")
             return None
+        key = self._doctor_key(specialty)
         
         day_lower = day.lower()
-        available_days = doctor.get('available_days', [])
-        logger.debug(f"   Doctor available days: {available_days}")
-        
         # Check if day is available
-        if day_lower not in available_days:
+        if day_lower not in self._available_days.get(key, frozenset()):
             logger.debug(f"   Doctor not available on {day}")
             return {"available": False, "message": f"Dr. {doctor['name']} is not available on {day}."}
         
         # Get slots for that day
-        slots = doctor.get('slots', {}).get(day_lower, [])
+        slots = self._slot_lists.get((key, day_lower), [])
         logger.debug(f"   Available slots on {day}: {slots}")
         
         if time:
             # Check specific time
-            logger.debug(f"   Checking specific time: {time}")
-            if time in slots:
+            if time in self._slot_sets.get((key, day_lower), frozenset()):
                 logger.debug(f"   Time {time} is available")
                 return {"available": True, "time": time}
-            else:
-                logger.debug(f"   Time {time} is not available, alternatives: {slots}")
-                return {"available": False, "message": f"{time} is not available.", "alternatives": slots}
-        else:
-            # Return all available slots
-            logger.debug(f"   Returning all available slots: {slots}")
-            return {"available": True, "slots": slots}
+            logger.debug(f"   Time {time} is not available, alternatives: {slots}")
+            return {"available": False, "message": f"{time} is not available.", "alternatives": list(slots)}
+        # Return all available slots
+        return {"available": True, "slots": list(slots)}
 
     def get_price(self, service_type):
         """Get price only when specifically asked"""
@@ -173,13 +309,17 @@ class LevoWellnessSmartKB:
                 return price
         
         # Check if it's a doctor
-        logger.debug(f"   Checking if '{service_type}' is a doctor")
-        doctors = self.data.get('doctors', {})
-        for specialty, doctor in doctors.items():
-            if service_type in specialty or service_type in doctor.get('short_name', ''):
-                fee = {"fee": doctor.get('consultation_fee')}
-                logger.debug(f"   Found doctor consultation fee: {fee}")
-                return fee
+        query = service_type.lower()
+        key = self._doctors.get(query) or self._doctor_words.get(query)
+        if key is None and query:
+            # Partial specialties ("derm", "nutrition"): first doctor in KB order with a word starting so
+            key = next((specialty for alias, specialty in self._doctors.items()
+                        if any(word.startswith(query) for word in alias.split())), None)
+        if key:
+            doctor = self.data['doctors'][key]
+            fee = {"fee": doctor.get('consultation_fee')}
+            logger.debug(f"   Found doctor consultation fee: {fee}")
+            return fee
         
         logger.debug(f"   No price found for service_type: '{service_type}'")
         return None
@@ -249,13 +389,13 @@ class LevoWellnessSmartKB:
 LevoWellnessDemoKB = LevoWellnessSmartKB
 
 
-# Example usage
+# Example usage (from the project root: python -m server.knowledge_base)
 if __name__ == "__main__":
     print("=" * 70)
     print("LEVO WELLNESS SMART KB - CONVERSATIONAL TESTS")
     print("=" * 70)
     
-    kb = LevoWellnessSmartKB()
+    kb = LevoWellnessSmartKB(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "knowledge_base.json"))
     
     print("\n1. ULTRA-MINIMAL GREETING:")
     print("-" * 70)
@@ -267,7 +407,8 @@ if __name__ == "__main__":
     test_queries = [
         "I want a massage",
         "Need a haircut",
-        "Want to see skin doctor"
+        "Want to see skin doctor",
+        "Can I book pilot is"
     ]
     
     for query in test_queries:
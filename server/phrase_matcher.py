@@ -0,0 +1,83 @@
+"""
+Phrase Matcher - Aho-Corasick multi-pattern automaton
+
+Finds every occurrence of every phrase (overlaps included) in a single linear
+pass over the text, however many phrases are registered.
+"""
+
+from collections import deque
+
+
+class PhraseMatcher:
+    """Multi-phrase automaton; build() once, then finditer() over any number of texts"""
+
+    def __init__(self, word_boundaries=False):
+        self.word_boundaries = word_boundaries
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self._built = False
+        self.phrase_count = 0
+
+    def add(self, phrase, payload):
+        """Register a phrase (matched case-sensitively; callers lower-case both sides)"""
+        if not phrase:
+            return
+        node = 0
+        for char in phrase:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = next_node
+        self._out[node].append((len(phrase), payload))
+        self.phrase_count += 1
+        self._built = False
+
+    def build(self):
+        """Compute failure links (breadth-first) and merge outputs along them"""
+        queue = deque()
+        for next_node in self._goto[0].values():
+            self._fail[next_node] = 0
+            queue.append(next_node)
+        while queue:
+            node = queue.popleft()
+            for char, next_node in self._goto[node].items():
+                queue.append(next_node)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_node] = target if target != next_node else 0
+                self._out[next_node] = self._out[next_node] + self._out[self._fail[next_node]]
+        self._built = True
+        return self
+
+    def finditer(self, text):
+        """Yield (start, end, payload) for every phrase occurrence in text"""
+        if not self._built:
+            self.build()
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        check_boundaries = self.word_boundaries
+        length = len(text)
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if not out[node]:
+                continue
+            end = index + 1
+            for phrase_length, payload in out[node]:
+                start = end - phrase_length
+                if check_boundaries and (
+                    (start > 0 and text[start - 1].isalnum())
+                    or (end < length and text[end].isalnum())
+                ):
+                    continue
+                yield start, end, payload
@@ -0,0 +1,65 @@
+"""
+Playback Tracker - Browser playback acknowledgements per utterance
+"""
+
+import asyncio
+import itertools
+from loguru import logger
+
+
+MAX_TRACKED_UTTERANCES = 32
+
+
+class PlaybackTracker:
+    """Tracks playback_started / playback_finished reports from the browser"""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self._counter = itertools.count(1)
+        self._started = {}
+        self._finished = {}
+
+    def new_utterance(self):
+        """Allocate an id for the next utterance sent to the browser"""
+        utterance_id = f"{self.session_id}-{next(self._counter)}"
+        # Browsers that never acknowledge must not make this grow forever
+        while len(self._finished) >= MAX_TRACKED_UTTERANCES:
+            stale = next(iter(self._finished))
+            self._finished.pop(stale)
+            self._started.pop(stale, None)
+        self._started[utterance_id] = asyncio.Event()
+        self._finished[utterance_id] = asyncio.Event()
+        return utterance_id
+
+    def mark_started(self, utterance_id):
+        """Browser started playing an utterance"""
+        event = self._started.get(utterance_id)
+        if event is None:
+            logger.debug(f"   Ignoring playback_started for unknown utterance {utterance_id}")
+            return
+        event.set()
+        logger.debug(f"▶️ Playback started: {utterance_id}")
+
+    def mark_finished(self, utterance_id):
+        """Browser finished (or stopped) playing an utterance"""
+        event = self._finished.pop(utterance_id, None)
+        self._started.pop(utterance_id, None)
+        if event is None:
+            logger.debug(f"   Ignoring playback_finished for unknown utterance {utterance_id}")
+            return
+        event.set()
+        logger.debug(f"⏹️ Playback finished: {utterance_id}")
+
+    async def wait_finished(self, utterance_id, timeout):
+        """Wait until the browser reports the utterance finished, at most `timeout` seconds"""
+        event = self._finished.get(utterance_id)
+        if event is None:
+            return True
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ No playback_finished for {utterance_id} within {timeout:.1f}s, continuing")
+            self._finished.pop(utterance_id, None)
+            self._started.pop(utterance_id, None)
+            return False
@@ -0,0 +1,432 @@
+"""
+Reply Rules - Voice post-processing rules for LLM replies
+
+The rule phrases are compiled once into a single PhraseMatcher automaton.
+Replies are filtered incrementally: LLM deltas are split into sentences, each
+sentence is scanned once, and a sentence is released as soon as no later text
+can change it, so speech can start before the completion has finished.
+"""
+
+import re
+from loguru import logger
+
+from server.phrase_matcher import PhraseMatcher
+from server.tts_pipeline import SentenceSplitter
+
+
+# Rule phrases, matched as lower-case substrings of a sentence
+REPLY_RULE_PHRASES = {
+    # Asking what the caller wants right after the greeting
+    "redundant": (
+        "how can i assist you",
+        "how can i help you",
+        "what can i do for you",
+        "what would you like to know",
+        "what would you like",
+        "i can help you with",
+        "i can help you",
+        "what would you like to know or do",
+        "assist in booking",
+    ),
+    "help_statement": ("i can help", "i can assist"),
+    # The assistant should answer immediately, never ask the caller to wait
+    "delay": (
+        "i'll need a moment",
+        "please hold on",
+        "hold on",
+        "wait a moment",
+        "give me a moment",
+        "one moment",
+        "just a moment",
+        "please wait",
+        "i'll get back to you",
+        "get back to you",
+    ),
+    "check": ("let me check", "checking", "i'll check"),
+    "let_me_check": ("let me check",),
+    "result": ("available", "confirmed", "booked", "yes", "no", "full"),
+    "alternative": ("alternative",),
+    "price": ("₹", "rupees", "price"),
+    # Follow-up questions after a service listing
+    "follow_up": (
+        "what are you interested in",
+        "how can i help",
+        "what would you like",
+        "which one",
+        "what can i do",
+        "how may i assist",
+    ),
+    "booking": ("booked", "confirmed", "appointment", "session"),
+    "booking_detail": ("for", "on", "at"),
+    "booked": ("booked",),
+    # Continuing after the information was already given (should STOP and WAIT)
+    "continuation": ("let me confirm", "let me verify", "i'll confirm", "i'll check"),
+    "generic_doctor": ("with a doctor", "with doctor", "with the doctor", "the doctor"),
+}
+
+# Service listing keywords and the department they stand for
+DEPARTMENT_PHRASES = {
+    "salon": "Salon",
+    "aesthetics": "Aesthetics",
+    "wellness": "Wellness",
+    "doctor": "Doctors",
+    "dermatologist": "Doctors",
+    "nutritionist": "Doctors",
+    "ayurveda": "Doctors",
+    "pain": "Doctors",
+    "package": "Packages",
+}
+DEPARTMENT_ORDER = ("Salon", "Aesthetics", "Wellness", "Doctors", "Packages")
+
+# Phrases looked up in the caller's last message
+USER_QUERY_PHRASES = {
+    "services_query": ("what services", "services available"),
+    "asks_available": ("available",),
+    "availability_query": ("available", "book", "appointment", "slot", "time", "when", "check"),
+}
+
+HELP_ACKNOWLEDGEMENT = "I'm here to help."
+CHECKING_ACKNOWLEDGEMENT = "Checking availability."
+
+MAX_SENTENCES = 2
+MAX_BOOKING_SENTENCES = 4
+MAX_WORDS = 50
+OPENER_WORDS = 2  # "Hello!", "Sure thing!" - spoken together with the sentence after them
+HISTORY_LOOKBACK = 10
+
+WITH_TITLE_RE = re.compile(r"with\s+(Dr\.|Ms\.)\s+", re.IGNORECASE)
+
+
+def build_doctor_specs(kb):
+    """Doctor names, department labels and replacement patterns from the KB doctors section"""
+    specs = []
+    for key, doctor in kb.data.get('doctors', {}).items():
+        name = doctor.get('name')
+        if not name:
+            continue
+        specialty = key.replace('_', ' ').lower()
+        department = specialty.title()
+        escaped = re.escape(specialty)
+        specs.append({
+            "specialty": specialty,
+            "name": name,
+            "department": department,
+            "label": f"{name} ({department})",
+            "the_doctor_re": re.compile(rf"the\s+{escaped}\s+doctor", re.IGNORECASE),
+            "with_the_doctor_re": re.compile(rf"with\s+the\s+{escaped}\s+doctor", re.IGNORECASE),
+            "with_specialty_re": re.compile(rf"with\s+{escaped}(?!\s+doctor)", re.IGNORECASE),
+            "labelled_name_re": re.compile(rf"{re.escape(name)}\s*\([^)]*\)", re.IGNORECASE),
+            "bare_name_re": re.compile(rf"({re.escape(name)})(?!\s*\([^)]*\))", re.IGNORECASE),
+        })
+    return specs
+
+
+class ReplyRules:
+    """Applies the voice post-processing rules to a complete LLM reply"""
+
+    def __init__(self, kb):
+        logger.debug("🔧 Initializing ReplyRules")
+        self.doctors = build_doctor_specs(kb)
+
+        tags = {}
+        for category, phrases in REPLY_RULE_PHRASES.items():
+            for phrase in phrases:
+                tags.setdefault(phrase, []).append(category)
+        for phrase, department in DEPARTMENT_PHRASES.items():
+            tags.setdefault(phrase, []).append(("department", department))
+        for index, doctor in enumerate(self.doctors):
+            specialty = doctor["specialty"]
+            tags.setdefault(f"the {specialty} doctor", []).append(("the_doctor", index))
+            tags.setdefault(f"with the {specialty} doctor", []).append(("with_the_doctor", index))
+            tags.setdefault(f"with {specialty}", []).append(("with_specialty", index))
+            tags.setdefault(doctor["name"].lower(), []).append(("doctor_name", index))
+        self.matcher = PhraseMatcher()
+        for phrase, phrase_tags in tags.items():
+            self.matcher.add(phrase, tuple(phrase_tags))
+        self.matcher.build()
+
+        self.query_matcher = PhraseMatcher()
+        for category, phrases in USER_QUERY_PHRASES.items():
+            for phrase in phrases:
+                self.query_matcher.add(phrase, category)
+        self.query_matcher.build()
+
+        self.specialty_matcher = PhraseMatcher()
+        for index, doctor in enumerate(self.doctors):
+            self.specialty_matcher.add(doctor["specialty"], index)
+        self.specialty_matcher.build()
+
+        logger.debug(f"   Compiled {self.matcher.phrase_count} rule phrases, {len(self.doctors)} doctors")
+
+    def scan(self, text):
+        """Rule tags occurring in a piece of reply text"""
+        return {tag for _, _, tags in self.matcher.finditer(text.lower()) for tag in tags}
+
+    def scan_query(self, user_text):
+        """Query categories occurring in the caller's message"""
+        return {category for _, _, category in self.query_matcher.finditer(user_text.lower())}
+
+    def stream(self, user_text="", history=()):
+        """Incremental filter for one reply"""
+        return ReplyStream(self, user_text, history)
+
+    def apply(self, assistant_text, user_text="", history=()):
+        """Return a complete reply rewritten by the rules"""
+        reply = self.stream(user_text, history)
+        reply.feed(assistant_text)
+        reply.finish()
+        return reply.text
+
+    def name_doctors(self, sentence, tags, history):
+        """Booking confirmations name the doctor and department instead of a generic reference"""
+        if "generic_doctor" in tags:
+            doctor = self._doctor_from_history(history)
+            if doctor is not None:
+                label = doctor["label"]
+                sentence = sentence.replace("with a doctor", f"with {label}")
+                sentence = sentence.replace("with doctor", f"with {label}")
+                sentence = sentence.replace("with the doctor", f"with {label}")
+                sentence = sentence.replace("the doctor", label)
+                logger.warning(f"⚠️ Replaced generic doctor reference with doctor and department: {label}")
+
+        for index, doctor in enumerate(self.doctors):
+            label = doctor["label"]
+            if ("the_doctor", index) in tags:
+                sentence = doctor["the_doctor_re"].sub(label, sentence)
+                logger.warning(f"⚠️ Replaced 'the {doctor['specialty']} doctor' with doctor and department: {label}")
+            if ("with_the_doctor", index) in tags:
+                sentence = doctor["with_the_doctor_re"].sub(f"with {label}", sentence)
+            if ("with_specialty", index) in tags and not WITH_TITLE_RE.search(sentence):
+                sentence = doctor["with_specialty_re"].sub(f"with {label}", sentence)
+                logger.warning(f"⚠️ Replaced 'with {doctor['specialty']}' with doctor and department: {label}")
+            if ("doctor_name", index) in tags and doctor["name"] in sentence and doctor["department"] not in sentence:
+                if not doctor["labelled_name_re"].search(sentence):
+                    sentence = doctor["bare_name_re"].sub(rf"\1 ({doctor['department']})", sentence)
+                    logger.warning(f"⚠️ Added department to existing doctor name: {label}")
+        return sentence
+
+    def _doctor_from_history(self, history):
+        """Most recently mentioned doctor specialty in the last few messages"""
+        for msg in reversed(list(history)[-HISTORY_LOOKBACK:]):
+            indices = [index for _, _, index in self.specialty_matcher.finditer(msg.get("content", "").lower())]
+            if indices:
+                return self.doctors[min(indices)]
+        return None
+
+
+# Doctor references that are rewritten once the reply turns out to be a booking
+DOCTOR_TAG_KINDS = {"the_doctor", "with_the_doctor", "with_specialty", "doctor_name"}
+
+
+def _mentions_doctor(tags):
+    return "generic_doctor" in tags or any(
+        isinstance(tag, tuple) and tag[0] in DOCTOR_TAG_KINDS for tag in tags
+    )
+
+
+class ReplyStream:
+    """Incremental reply filter: consumes LLM deltas and releases sentences no later text can change
+
+    Rules are applied per sentence as it completes. A sentence whose fate
+    depends on text that has not arrived yet (a possible booking confirmation
+    beyond the 2-sentence cap, a doctor reference before "booked" was seen,
+    "let me check" before its result, a short opener such as "Hello!" that a
+    redundant "How can I help you?" would replace) is held, together with
+    everything after it, until that text arrives or the stream ends.
+    """
+
+    def __init__(self, rules, user_text="", history=()):
+        self.rules = rules
+        self.history = history
+        self.query = rules.scan_query(user_text)
+        self._splitter = SentenceSplitter()
+        self._pending = []
+        # Tags over every completed sentence, dropped ones included
+        self.seen = set()
+        self.has_question = False
+        # A service listing may collapse to its departments, so it is only released at the end
+        self._hold_all = "services_query" in self.query
+        self.released = []
+        self.kept_count = 0
+        self.word_count = 0
+        self.dropped_delay = False
+        # Set once a rule ended the reply; any further text is discarded
+        self.done = False
+
+    @property
+    def text(self):
+        return " ".join(self.released)
+
+    @property
+    def sentence_limit(self):
+        """Sentence budget for the reply type detected so far"""
+        if "booking" in self.seen and "booking_detail" in self.seen:
+            return MAX_BOOKING_SENTENCES
+        return MAX_SENTENCES
+
+    @property
+    def exhausted(self):
+        """The voice budget for the detected reply type is spent; later text would be discarded
+
+        Past the 2-sentence cap a reply may still turn out to be a booking
+        confirmation ("Great! Thank you. Your appointment is confirmed..."), so
+        it only counts as spent once a sentence beyond the cap has arrived and
+        the reply is still not a booking.
+        """
+        if self.done or self.kept_count >= MAX_BOOKING_SENTENCES or self.word_count >= MAX_WORDS:
+            return True
+        return bool(self._pending) and self.kept_count >= self.sentence_limit
+
+    def feed(self, delta):
+        """Add an LLM delta and return the sentences that became safe to speak"""
+        for sentence in self._splitter.feed(delta):
+            self._add(sentence)
+        return self._drain(final=False)
+
+    def finish(self):
+        """Flush the end of the reply and return the remaining sentences to speak"""
+        tail = self._splitter.flush()
+        if tail:
+            self._add(tail)
+        released = self._drain(final=True)
+        if not self.released and self.dropped_delay:
+            # The reply was nothing but "hold on"
+            if "availability_query" in self.query:
+                logger.warning("⚠️ Detected delay phrase for availability check without result, should provide result immediately")
+                released.append(self._emit(CHECKING_ACKNOWLEDGEMENT))
+            else:
+                logger.warning("⚠️ Detected delay phrase, replacing with acknowledgment")
+                released.append(self._emit(HELP_ACKNOWLEDGEMENT))
+        logger.debug(f"   Filtered reply: '{self.text}'")
+        return released
+
+    def _add(self, sentence):
+        if self.done:
+            return
+        tags = self.rules.scan(sentence)
+        self.seen |= tags
+        self.has_question = self.has_question or "?" in sentence
+        self._pending.append((sentence, tags))
+
+    def _emit(self, sentence):
+        self.released.append(sentence)
+        return sentence
+
+    def _end(self, reason):
+        logger.warning(f"⚠️ {reason}")
+        self.done = True
+        self._pending.clear()
+
+    def _drain(self, final):
+        released = []
+        if self._hold_all:
+            if not final:
+                return released
+            self._hold_all = False
+            summary = self._summarize_listing()
+            if summary:
+                released.append(self._emit(summary))
+                self._end("Detected detailed service listing, simplified to departments only")
+                return released
+
+        while self._pending and not self.done:
+            sentence, tags = self._pending.pop(0)
+            verdict = self._judge(sentence, tags, final)
+            if verdict is None:
+                self._pending.insert(0, (sentence, tags))
+                break
+            if verdict is False:
+                continue
+            self.kept_count += 1
+            self.word_count += len(verdict.split())
+            released.append(self._emit(verdict))
+        return released
+
+    def _judge(self, sentence, tags, final):
+        """Released (possibly rewritten) sentence, False to drop it, or None to hold it"""
+        # Redundant question or offer of help after the greeting
+        if "redundant" in tags:
+            if self._is_redundant_question(sentence, tags):
+                self._end("Detected redundant question, replacing with simple acknowledgment")
+                return False if self.released else HELP_ACKNOWLEDGEMENT
+            if not final:
+                return None
+
+        # "Hold on" / "one moment" - the answer should come immediately
+        if "delay" in tags and not ("check" in tags and ("result" in tags or "alternative" in tags)):
+            self.dropped_delay = True
+            return False
+
+        # A short opener followed by a redundant offer of help collapses with it
+        if not self.released and len(sentence.split()) <= OPENER_WORDS:
+            if not self._pending:
+                if not final:
+                    return None
+            elif "redundant" in self._pending[0][1]:
+                if self._is_redundant_question(*self._pending[0]):
+                    self._end("Detected redundant question after an opener, replacing with simple acknowledgment")
+                    return HELP_ACKNOWLEDGEMENT
+                if not final:
+                    return None
+
+        # 1-2 sentences for most replies, up to 4 for booking confirmations
+        if self.kept_count >= MAX_BOOKING_SENTENCES:
+            self._end(f"Response too long, truncated to {MAX_BOOKING_SENTENCES} sentences")
+            return False
+        if self.kept_count >= self.sentence_limit:
+            if not final:
+                return None
+            self._end(f"Response too long, truncated to {self.sentence_limit} sentences")
+            return False
+
+        if self.word_count >= MAX_WORDS:
+            self._end(f"Response reached {MAX_WORDS} words, truncated")
+            return False
+
+        # Continuing after the information was given - stop and wait for the caller
+        if self.kept_count and "continuation" in tags:
+            self._end("Detected continuation after providing info, truncated to stop and wait")
+            return False
+        if self.kept_count and "let_me_check" in tags and "result" not in self.seen:
+            if not final:
+                return None
+            if len(self._pending) > 1:
+                self._end("Detected 'let me check' without result, truncated")
+                return False
+
+        # Doctor references are only expanded in booking confirmations
+        if _mentions_doctor(tags):
+            if "booked" in self.seen:
+                sentence = self.rules.name_doctors(sentence, tags, self.history)
+            elif not final:
+                return None
+
+        # Wordy lists keep only their intro and first point
+        word_count = self.word_count + len(sentence.split())
+        if word_count > MAX_WORDS and ':' in sentence:
+            intro, rest = sentence.split(':', 2)[:2]
+            first_point = rest.split(',')[0].strip() if ',' in rest else rest.split('.')[0].strip()
+            self._end(f"Response too wordy ({word_count} words), shortened")
+            return f"{intro.strip()}: {first_point}."
+        return sentence
+
+    def _is_redundant_question(self, sentence, tags):
+        """Asking what the caller wants, or offering help, instead of answering"""
+        return "redundant" in tags and ("?" in sentence or self.has_question or "help_statement" in tags)
+
+    def _summarize_listing(self):
+        """For "what services" questions: departments only, and no follow-up question"""
+        listing = [(sentence, tags) for sentence, tags in self._pending if "delay" not in tags]
+        if any("price" in tags for _, tags in listing) and "asks_available" not in self.query:
+            found = {
+                tag[1] for _, tags in listing for tag in tags
+                if isinstance(tag, tuple) and tag[0] == "department"
+            }
+            if found:
+                return "We offer " + ", ".join(d for d in DEPARTMENT_ORDER if d in found) + "."
+        for sentence, tags in listing[1:]:
+            if "follow_up" in tags and "?" in sentence:
+                logger.warning("⚠️ Detected follow-up question after service listing, removed - should just list and STOP")
+                self._pending = listing[:1]
+                break
+        return None
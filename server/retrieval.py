@@ -0,0 +1,180 @@
+"""
+KB Retrieval - Per-turn BM25 retrieval of knowledge base snippets
+
+The KB is split into short snippets (clinic info, booking rules, departments,
+services, doctors, packages) and indexed once, when the snapshot loads, into
+an in-memory inverted index. Each turn scores the snippets against the
+caller's transcript and returns the best few under a token cap, so the LLM is
+grounded in the relevant facts without carrying the whole KB in its prompt.
+"""
+
+import math
+import re
+from collections import Counter, defaultdict
+from loguru import logger
+
+from server.history import estimate_tokens
+
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are at be can could do does for from have how i if in is it me my of on or "
+    "please so that the there this to want we what when where which with would you your".split()
+)
+BM25_K1 = 1.2
+BM25_B = 0.75
+MIN_RELATIVE_SCORE = 0.5  # Snippets scoring below half of the best match are noise
+NAME_MIN_SCORE = 0.8  # Fuzzy names widen the query only on a strong match ("and jolly car" -> Anjali)
+
+
+def tokenize(text):
+    """Lowercase word stems of a text: stopwords dropped, a plural 's' stripped"""
+    terms = []
+    for word in TOKEN_RE.findall(text.lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+def _money(value):
+    return f"Rs {value:,}"
+
+
+def kb_snippets(data):
+    """(snippet text, extra search terms) for every section of the KB"""
+    snippets = []
+    clinic = data.get('clinic_info', {})
+    if clinic:
+        contact = clinic.get('contact', {})
+        hours = "; ".join(f"{days.replace('_', ' ')} {time}" for days, time in clinic.get('operating_hours', {}).items())
+        snippets.append((
+            f"{clinic.get('name', 'Clinic')}: {clinic.get('location', '')}. Open {hours}. "
+            f"Phone {contact.get('main_phone', '')}, WhatsApp {contact.get('whatsapp', '')}, email {contact.get('email', '')}.",
+            "address location hours timing open close contact phone number call"
+        ))
+    rules = data.get('booking_rules', {})
+    if rules:
+        snippets.append((
+            "Booking rules: " + "; ".join(f"{name.replace('_', ' ')} {rule}" for name, rule in rules.items()) + ".",
+            "booking cancel cancellation reschedule late no show fee policy"
+        ))
+    keywords = defaultdict(list)
+    for keyword, target in data.get('conversation_hints', {}).get('service_keywords', {}).items():
+        keywords[target].append(keyword)
+    for department in data.get('departments', {}).values():
+        services = department.get('services', {})
+        snippets.append((
+            f"{department.get('name', '')} department: " + ", ".join(s.get('name', k) for k, s in services.items()) + ".",
+            "services offer department"
+        ))
+        for key, service in services.items():
+            if 'price_range' in service:
+                price = f"{_money(service['price_range']['min'])}-{_money(service['price_range']['max'])}"
+            else:
+                price = _money(service['price']) if 'price' in service else "on request"
+            staff = service.get('staff') or service.get('instructor') or ''
+            days = ", ".join(day.title() for day in service.get('available_days', []))
+            snippets.append((
+                f"{service.get('name', key)} ({department.get('name', '')}): {', '.join(service.get('types', []))}. "
+                f"{price}, {service.get('duration', '')}. With {staff}, {days}.",
+                " ".join(
+                    [key.replace('_', ' '), service.get('short_name') or '']
+                    + keywords.get(key.replace('_', ' '), []) + keywords.get(service.get('short_name'), [])
+                )
+            ))
+    for key, doctor in data.get('doctors', {}).items():
+        specialty = key.replace('_', ' ')
+        days = ", ".join(day.title() for day in doctor.get('available_days', []))
+        snippets.append((
+            f"{doctor['name']} ({specialty.title()}, {doctor.get('qualification', '')}): "
+            f"{', '.join(doctor.get('specialization', []))}. Consultation {_money(doctor.get('consultation_fee', 0))}, {days}.",
+            " ".join(["doctor", specialty, doctor.get('short_name') or ''] + keywords.get(specialty, []))
+        ))
+    for package in data.get('packages', {}).values():
+        snippets.append((
+            f"{package.get('name', '')}: {package.get('summary', '')}. {_money(package.get('price', 0))}, valid {package.get('validity', '')}.",
+            "package offer deal bundle"
+        ))
+    return snippets
+
+
+class KBRetriever:
+    """BM25 over the KB snippets of one snapshot"""
+
+    def __init__(self, kb, top_k=3, token_cap=250):
+        logger.debug("🔧 Initializing KBRetriever")
+        self.top_k = top_k
+        self.token_cap = token_cap
+        self._find_names = kb.find_names
+        self.snippets = []
+        self._tokens = []  # Estimated prompt tokens per snippet
+        self._lengths = []
+        self._postings = defaultdict(list)  # term -> [(snippet index, term frequency)]
+        for index, (text, extra_terms) in enumerate(kb_snippets(kb.data)):
+            counts = Counter(tokenize(text) + tokenize(extra_terms))
+            for term, frequency in counts.items():
+                self._postings[term].append((index, frequency))
+            self.snippets.append(text)
+            self._tokens.append(estimate_tokens(text) + 1)
+            self._lengths.append(sum(counts.values()))
+        count = len(self.snippets)
+        self._average_length = sum(self._lengths) / count if count else 0
+        self._idf = {
+            term: math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+        logger.debug(f"   {count} snippets, {len(self._postings)} terms")
+
+    def search(self, query):
+        """(score, snippet index) of the matching snippets, best first"""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for index, frequency in self._postings[term]:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[index] / self._average_length)
+                scores[index] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+        return sorted(((score, index) for index, score in scores.items()), reverse=True)
+
+    def _unmatched_runs(self, query):
+        """Runs of words with no exact index term, split at the words that have one"""
+        runs = [[]]
+        for word in TOKEN_RE.findall(query.lower()):
+            terms = tokenize(word)
+            if terms and terms[0] in self._idf:
+                if runs[-1]:
+                    runs.append([])
+            else:
+                runs[-1].append(word)
+        return [" ".join(run) for run in runs if run]
+
+    def _names(self, query):
+        """Canonical names of the KB entities misheard in a transcript ("pilot is" -> Pilates)"""
+        names = {}
+        for run in self._unmatched_runs(query):
+            for match in self._find_names(run, min_score=NAME_MIN_SCORE):
+                names.setdefault(match.name, None)
+        return " ".join(names)
+
+    def context(self, query):
+        """The top snippets for a transcript, within the token cap, or None"""
+        chosen = []
+        budget = self.token_cap
+        # Misheard names still retrieve their snippets; words the index knows need no help
+        names = self._names(query)
+        results = self.search(f"{query} {names}" if names else query)
+        for score, index in results:
+            if len(chosen) == self.top_k or score < results[0][0] * MIN_RELATIVE_SCORE:
+                break
+            if self._tokens[index] > budget:
+                continue
+            chosen.append(self.snippets[index])
+            budget -= self._tokens[index]
+        if not chosen:
+            return None
+        logger.debug(f"📎 Retrieved {len(chosen)} KB snippets (~{self.token_cap - budget} tokens) for: {query[:60]}")
+        return "\n".join(f"- {snippet}" for snippet in chosen)
@@ -0,0 +1,67 @@
+"""
+Session - Per-connection conversation state
+"""
+
+import time
+import uuid
+from loguru import logger
+
+from config.settings import config
+from server.history import ConversationHistory
+from server.playback import PlaybackTracker
+
+
+class Session:
+    """Holds the state of one browser connection (history, greeting flag, Deepgram socket)"""
+
+    def __init__(self, websocket):
+        self.id = uuid.uuid4().hex[:8]
+        self.websocket = websocket
+        self.client_addr = websocket.remote_address
+        self.history = ConversationHistory(
+            token_budget=config.openai.history_token_budget,
+            summary_max_tokens=config.openai.summary_max_tokens,
+            min_recent_messages=config.openai.min_recent_messages
+        )
+        self.greeting_sent = False
+        self.dg_ws = None
+        self.uplink = None
+        self.reply_task = None  # In-flight LLM + TTS reply, cancelled on barge-in
+        self.snapshot = None  # KB snapshot of the current turn (set when the turn starts)
+        self.playback = PlaybackTracker(self.id)
+        self.llm_early_stops = 0
+        self.llm_tokens_saved = 0  # Upper bound: max_tokens minus what was generated before each stop
+        self.created_at = time.monotonic()
+        logger.debug(f"🆕 Session {self.id} created for {self.client_addr}")
+
+    @property
+    def age(self):
+        """Seconds since the session was created"""
+        return time.monotonic() - self.created_at
+
+
+class SessionRegistry:
+    """Tracks the live sessions of this process"""
+
+    def __init__(self):
+        self._sessions = {}
+
+    def add(self, session):
+        """Register a new session"""
+        self._sessions[session.id] = session
+        logger.debug(f"   Active sessions: {len(self._sessions)}")
+
+    def remove(self, session):
+        """Unregister a session (no-op if already removed)"""
+        self._sessions.pop(session.id, None)
+        logger.debug(f"   Active sessions: {len(self._sessions)}")
+
+    def get(self, session_id):
+        """Look up a session by id"""
+        return self._sessions.get(session_id)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __iter__(self):
+        return iter(list(self._sessions.values()))
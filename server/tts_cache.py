@@ -0,0 +1,225 @@
+"""
+TTS Audio Cache - Content-addressed audio cache (memory LRU + disk) and pre-rendered greetings
+
+Only pinned greetings are written to disk as soon as they are stored. Other
+sentences are LLM free text (booking confirmations carry names and phone
+numbers), so they stay in memory and, when the disk tier is enabled, are
+persisted only once they have been replayed from memory disk_admit_hits times
+(a phrase that really repeats across calls).
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from loguru import logger
+
+
+CHUNK_SIZE = 4096
+
+
+def tts_cache_key(text, voice_id, model, stability, similarity_boost):
+    """Content hash of everything that determines the synthesized audio"""
+    payload = json.dumps(
+        [text, voice_id, model, stability, similarity_boost],
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def iter_chunks(audio, chunk_size=CHUNK_SIZE):
+    """Split cached audio into websocket-sized chunks"""
+    for start in range(0, len(audio), chunk_size):
+        yield audio[start:start + chunk_size]
+
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _write_file(path, audio):
+    """Write atomically so a crash never leaves a truncated cache entry"""
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(audio)
+    os.replace(tmp_path, path)
+
+
+class TTSCache:
+    """Two-tier audio cache: bounded in-memory LRU plus an optional on-disk tier"""
+
+    def __init__(self, cache_dir, max_bytes=32 * 1024 * 1024, max_entries=2048,
+                 disk_enabled=False, disk_max_entries=10000, max_text_chars=300, disk_admit_hits=2):
+        logger.debug("🔧 Initializing TTSCache")
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.disk_enabled = disk_enabled
+        self.disk_max_entries = disk_max_entries
+        self.max_text_chars = max_text_chars
+        self.disk_admit_hits = disk_admit_hits
+        self._lru = OrderedDict()
+        # Memory hits per LRU entry, until it is admitted to the disk tier
+        self._replays = {}
+        # Pinned entries (e.g. greetings) never count against the LRU and are never evicted
+        self._pinned = {}
+        self.memory_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stores = 0
+        self._disk_writes = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        logger.debug(f"   Directory: {cache_dir}, memory: {max_bytes} bytes / {max_entries} entries, disk: {disk_enabled} (after {disk_admit_hits} replays)")
+
+    def cacheable(self, text):
+        """Only short phrases are worth caching; long free-form replies rarely repeat"""
+        return len(text) <= self.max_text_chars
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.mp3")
+
+    async def get(self, key):
+        """Cached audio for a key, or None (memory first, then disk)"""
+        audio = self._pinned.get(key)
+        if audio is None:
+            audio = self._lru.get(key)
+            if audio is not None:
+                self._lru.move_to_end(key)
+                await self._replayed(key, audio)
+        if audio is not None:
+            self.hits += 1
+            return audio
+
+        if self.disk_enabled:
+            path = self._path(key)
+            if os.path.exists(path):
+                audio = await asyncio.to_thread(_read_file, path)
+                self.disk_hits += 1
+                self._remember(key, audio)
+                self._replays.pop(key, None)  # Already on disk
+                return audio
+
+        self.misses += 1
+        return None
+
+    async def put(self, key, audio, pin=False):
+        """Store audio in memory; pinned entries are also persisted on disk right away"""
+        if pin:
+            self._pinned[key] = audio
+            self._lru.pop(key, None)
+            self._replays.pop(key, None)
+        else:
+            self._remember(key, audio)
+        self.stores += 1
+        if pin:
+            await self._write_disk(key, audio)
+
+    async def _replayed(self, key, audio):
+        """Count a memory hit; a phrase replayed often enough is admitted to the disk tier"""
+        if not self.disk_enabled or key not in self._replays:
+            return
+        self._replays[key] += 1
+        if self._replays[key] >= self.disk_admit_hits:
+            del self._replays[key]
+            await self._write_disk(key, audio)
+
+    async def _write_disk(self, key, audio):
+        await asyncio.to_thread(_write_file, self._path(key), audio)
+        self._disk_writes += 1
+        if self._disk_writes % 100 == 0:
+            await asyncio.to_thread(self._prune_disk)
+
+    async def load_pinned(self, key):
+        """Load a pinned entry from disk if it was persisted before"""
+        if key in self._pinned:
+            return self._pinned[key]
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        audio = await asyncio.to_thread(_read_file, path)
+        self._pinned[key] = audio
+        return audio
+
+    def _remember(self, key, audio):
+        """Insert into the LRU and evict least recently used entries beyond the bounds"""
+        if key in self._pinned or len(audio) > self.max_bytes:
+            return
+        previous = self._lru.pop(key, None)
+        if previous is not None:
+            self.memory_bytes -= len(previous)
+        self._lru[key] = audio
+        self.memory_bytes += len(audio)
+        if previous is None:
+            self._replays[key] = 0
+        while self._lru and (self.memory_bytes > self.max_bytes or len(self._lru) > self.max_entries):
+            evicted_key, evicted = self._lru.popitem(last=False)
+            self._replays.pop(evicted_key, None)
+            self.memory_bytes -= len(evicted)
+            self.evictions += 1
+
+    def _prune_disk(self):
+        """Delete the oldest disk entries beyond disk_max_entries (pinned entries are kept)"""
+        pinned = {f"{key}.mp3" for key in self._pinned}
+        entries = [
+            entry for entry in os.scandir(self.cache_dir)
+            if entry.name.endswith(".mp3") and entry.name not in pinned
+        ]
+        excess = len(entries) - self.disk_max_entries
+        if excess <= 0:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:excess]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+        logger.debug(f"   Pruned {excess} TTS disk cache entries")
+
+    def stats(self):
+        """Snapshot of the cache metrics"""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "stores": self.stores,
+            "memory_entries": len(self._lru),
+            "memory_bytes": self.memory_bytes,
+            "pinned_entries": len(self._pinned),
+        }
+
+
+class GreetingAudioCache:
+    """Greeting audio rendered once per voice settings, pinned in the TTS cache and persisted on disk"""
+
+    def __init__(self, tts):
+        logger.debug("🔧 Initializing GreetingAudioCache")
+        self.tts = tts
+        self.cache = tts.cache
+
+    async def load(self, texts):
+        """Load every greeting from disk, rendering (and persisting) the missing ones"""
+        loaded = 0
+        rendered = 0
+        for text in dict.fromkeys(t for t in texts if t):
+            key = self.tts.cache_key(text)
+            if await self.cache.load_pinned(key) is not None:
+                loaded += 1
+                continue
+
+            logger.debug(f"   Rendering greeting audio for: '{text[:60]}'")
+            chunks = await self.tts.generate_speech(text)
+            if not chunks:
+                logger.warning(f"⚠️ Could not pre-render greeting, it will be synthesized per call: '{text[:60]}'")
+                continue
+            await self.cache.put(key, b"".join(chunks), pin=True)
+            rendered += 1
+
+        logger.info(f"🎵 Greeting audio cache ready ({loaded} loaded from disk, {rendered} newly rendered)")
@@ -3,16 +3,17 @@ Text-to-Speech Handler using ElevenLabs
 """
 
 import asyncio
-import requests
+import httpx
 from loguru import logger
 
 from config.settings import config
+from server.tts_cache import iter_chunks, tts_cache_key
 
 
 class TTSHandler:
-    """Handles text-to-speech using ElevenLabs API"""
-    
-    def __init__(self):
+    """Handles text-to-speech using ElevenLabs API over a shared keep-alive connection pool"""
+
+    def __init__(self, cache=None):
         logger.debug("🔧 Initializing TTSHandler")
         self.config = config.elevenlabs
         self.api_key = self.config.api_key
@@ -22,22 +23,53 @@ class TTSHandler:
         logger.debug(f"   Stability: {self.config.stability}")
         logger.debug(f"   Similarity boost: {self.config.similarity_boost}")
         logger.debug(f"   API key length: {len(self.api_key)}")
+        logger.debug(f"   Pool: max_connections={self.config.max_connections}, keepalive={self.config.max_keepalive_connections}, in-flight={self.config.max_concurrent_requests}")
+        self._client = None
+        self._semaphore = None
+        self.cache = cache
+        logger.debug(f"   Audio cache: {'enabled' if cache is not None else 'disabled'}")
         logger.debug("✅ TTSHandler initialized")
-    
-    async def generate_speech(self, text):
-        """Generate speech from text and return audio chunks"""
-        logger.debug(f"🔊 generate_speech called with text: '{text}'")
-        logger.debug(f"   Text length: {len(text)} chars")
-        url = f"https://api.elevenlabs.io/v1/text-to-speech/{self.voice_id}/stream"
-        logger.debug(f"   TTS URL: {url.split('/stream')[0]}...")
-        
-        headers = {
-            "Accept": "audio/mpeg",
-            "Content-Type": "application/json",
-            "xi-api-key": self.api_key
-        }
-        
-        data = {
+
+    @property
+    def client(self):
+        """Process-wide pooled HTTP client (created on first use)"""
+        if self._client is None or self._client.is_closed:
+            logger.debug("🔌 Creating pooled ElevenLabs HTTP client")
+            self._client = httpx.AsyncClient(
+                base_url="https://api.elevenlabs.io",
+                headers={
+                    "Accept": "audio/mpeg",
+                    "xi-api-key": self.api_key
+                },
+                limits=httpx.Limits(
+                    max_connections=self.config.max_connections,
+                    max_keepalive_connections=self.config.max_keepalive_connections,
+                    keepalive_expiry=self.config.keepalive_expiry
+                ),
+                timeout=httpx.Timeout(self.config.request_timeout, connect=5.0)
+            )
+        return self._client
+
+    @property
+    def semaphore(self):
+        """Bounds the number of TTS requests in flight"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.config.max_concurrent_requests)
+        return self._semaphore
+
+    def cache_key(self, text):
+        """Cache key for text under the current voice settings"""
+        return tts_cache_key(
+            text,
+            self.voice_id,
+            self.config.model,
+            self.config.stability,
+            self.config.similarity_boost
+        )
+
+    def _request_body(self, text):
+        """Build the ElevenLabs request payload"""
+        return {
             "text": text,
             "model_id": self.config.model,
             "voice_settings": {
@@ -45,40 +77,58 @@ class TTSHandler:
                 "similarity_boost": self.config.similarity_boost
             }
         }
-        logger.debug(f"   Request data keys: {list(data.keys())}")
-        logger.debug(f"   Voice settings: stability={self.config.stability}, similarity_boost={self.config.similarity_boost}")
-        
-        try:
-            logger.debug("   Sending request to ElevenLabs API (in thread pool)")
-            # Make request in thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: requests.post(url, json=data, headers=headers, stream=True)
-            )
-            logger.debug(f"   ElevenLabs API response status: {response.status_code}")
-            
-            if response.status_code == 200:
-                logger.debug("   ✅ ElevenLabs API request successful, collecting audio chunks")
-                # Yield audio chunks
-                chunks = []
+
+    async def stream_speech(self, text):
+        """Stream audio chunks for text as they arrive from ElevenLabs"""
+        logger.debug(f"🔊 stream_speech called with text: '{text}'")
+        logger.debug(f"   Text length: {len(text)} chars")
+        key = None
+        if self.cache is not None and self.cache.cacheable(text):
+            key = self.cache_key(text)
+            audio = await self.cache.get(key)
+            if audio is not None:
+                logger.debug(f"   ⚡ TTS cache hit ({len(audio)} bytes)")
+                for chunk in iter_chunks(audio):
+                    yield chunk
+                return
+        url = f"/v1/text-to-speech/{self.voice_id}/stream"
+
+        async with self.semaphore:
+            async with self.client.stream("POST", url, json=self._request_body(text)) as response:
+                logger.debug(f"   ElevenLabs API response status: {response.status_code}")
+                if response.status_code != 200:
+                    body = await response.aread()
+                    logger.error(f"❌ TTS API error: {response.status_code} - {body[:200]!r}")
+                    logger.debug(f"   Response headers: {dict(response.headers)}")
+                    return
+
                 chunk_count = 0
                 total_bytes = 0
-                for chunk in response.iter_content(chunk_size=4096):
+                parts = []
+                async for chunk in response.aiter_bytes(chunk_size=4096):
                     if chunk:
                         chunk_count += 1
                         total_bytes += len(chunk)
-                        chunks.append(chunk)
-                        if chunk_count % 10 == 0:
-                            logger.debug(f"   Collected {chunk_count} chunks ({total_bytes} bytes)")
-                logger.debug(f"✅ Audio generation complete: {chunk_count} chunks, {total_bytes} bytes")
-                return chunks
-            else:
-                logger.error(f"❌ TTS API error: {response.status_code} - {response.text}")
-                logger.debug(f"   Response headers: {dict(response.headers)}")
-                return []
-                
+                        if key is not None:
+                            parts.append(chunk)
+                        yield chunk
+                logger.debug(f"✅ Audio stream complete: {chunk_count} chunks, {total_bytes} bytes")
+
+        # Only complete streams are cached (a cancelled reply never gets here)
+        if key is not None and parts:
+            await self.cache.put(key, b"".join(parts))
+
+    async def generate_speech(self, text):
+        """Generate speech from text and return audio chunks"""
+        try:
+            return [chunk async for chunk in self.stream_speech(text)]
         except Exception as e:
             logger.error(f"❌ TTS generation error: {e}")
             logger.exception("   Full exception traceback:")
             return []
+
+    async def aclose(self):
+        """Close the pooled HTTP client"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            logger.debug("✅ ElevenLabs HTTP client closed")
@@ -0,0 +1,190 @@
+"""
+Sentence-pipelined Text-to-Speech
+
+Splits streamed LLM text into sentences and synthesizes each one as soon as it
+is complete, while audio is delivered to the browser strictly in order.
+"""
+
+import asyncio
+import json
+import re
+from contextlib import aclosing
+from loguru import logger
+
+
+# Abbreviations whose trailing period does not end a sentence ("Dr. Anjali Khanna")
+ABBREVIATIONS = {"dr", "ms", "mr", "mrs", "st", "vs", "approx"}
+# Abbreviations only when a number follows ("No. 5"); otherwise a word ("No. That slot is taken.")
+NUMBER_ABBREVIATIONS = {"no"}
+
+SENTENCE_END_RE = re.compile(r'[.!?]+["\')\]]*(?=\s)')
+
+
+def _ends_with_abbreviation(text, following):
+    """Check if text ends with a known abbreviation followed by its period
+
+    following is the text after the period; None when the answer depends on
+    text that has not arrived yet.
+    """
+    words = text.rstrip('.').split()
+    if not words:
+        return False
+    word = words[-1].lower()
+    if word in NUMBER_ABBREVIATIONS:
+        following = following.lstrip()
+        return following[0].isdigit() if following else None
+    return word in ABBREVIATIONS
+
+
+def _strip_span(text, start, end):
+    """Narrow a span so it excludes surrounding whitespace"""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def sentence_spans(text):
+    """(start, end) offsets of every sentence in a complete text"""
+    spans = []
+    start = 0
+    for match in SENTENCE_END_RE.finditer(text):
+        if _ends_with_abbreviation(text[start:match.end()], text[match.end():]):
+            continue
+        span = _strip_span(text, start, match.end())
+        if span[0] < span[1]:
+            spans.append(span)
+        start = match.end()
+    span = _strip_span(text, start, len(text))
+    if span[0] < span[1]:
+        spans.append(span)
+    return spans
+
+
+def split_sentences(text):
+    """Split a complete text into sentences"""
+    return [text[start:end] for start, end in sentence_spans(text)]
+
+
+class SentenceSplitter:
+    """Incrementally splits a stream of text deltas into complete sentences"""
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, delta):
+        """Add a delta and return the sentences it completed"""
+        self._buffer += delta
+        sentences = []
+        start = 0
+        # A terminator only counts once the following whitespace has arrived
+        for match in SENTENCE_END_RE.finditer(self._buffer):
+            candidate = self._buffer[start:match.end()]
+            abbreviation = _ends_with_abbreviation(candidate, self._buffer[match.end():])
+            if abbreviation is None:
+                # "No." with nothing after it yet: wait for the next delta to decide
+                break
+            if abbreviation:
+                continue
+            sentence = candidate.strip()
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self):
+        """Return whatever is left once the stream has ended"""
+        tail = self._buffer.strip()
+        self._buffer = ""
+        return tail
+
+
+class SpeechPipeline:
+    """Synthesizes sentences concurrently and streams their audio to the browser in order"""
+
+    def __init__(self, tts, websocket, utterance_id=None, gate=None):
+        self.tts = tts
+        self.websocket = websocket
+        self.utterance_id = utterance_id
+        # Optional task that must complete before any audio is delivered (e.g. greeting playback)
+        self.gate = gate
+        # One chunk queue per submitted sentence, in submission order
+        self._order = asyncio.Queue()
+        self._tasks = []
+        self.sentence_count = 0
+        self.chunk_count = 0
+        self.total_bytes = 0
+        self._sender = asyncio.create_task(self._send_in_order())
+
+    def submit(self, sentence):
+        """Start synthesizing a sentence right away"""
+        self.sentence_count += 1
+        logger.debug(f"🔊 Pipelining sentence #{self.sentence_count} to TTS: '{sentence}'")
+        chunks = asyncio.Queue()
+        self._order.put_nowait(chunks)
+        self._tasks.append(asyncio.create_task(self._synthesize(sentence, chunks)))
+
+    async def _synthesize(self, sentence, chunks):
+        """Fetch audio for one sentence into its queue (None marks the end)"""
+        try:
+            async with aclosing(self.tts.stream_speech(sentence)) as stream:
+                async for chunk in stream:
+                    chunks.put_nowait(chunk)
+        except Exception as e:
+            logger.error(f"❌ TTS error for sentence: {e}")
+            logger.exception("   Full exception traceback:")
+        finally:
+            chunks.put_nowait(None)
+
+    async def _send_in_order(self):
+        """Drain the per-sentence queues one after another"""
+        while True:
+            chunks = await self._order.get()
+            if chunks is None:
+                return
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    break
+                if self.chunk_count == 0:
+                    await self._start_delivery()
+                self.chunk_count += 1
+                self.total_bytes += len(chunk)
+                await self.websocket.send(chunk)
+                if self.chunk_count % 10 == 0:
+                    logger.debug(f"   Sent {self.chunk_count} audio chunks ({self.total_bytes} bytes)")
+
+    async def _start_delivery(self):
+        """Hold the first chunk until the gate opens, then announce the utterance"""
+        if self.gate is not None:
+            logger.debug("   Holding reply audio until the gate opens")
+            # Shielded: closing the pipeline must not cancel the gate's own work
+            await asyncio.shield(self.gate)
+        await self.websocket.send(json.dumps({'type': 'tts_start', 'utterance_id': self.utterance_id}))
+
+    async def finish(self):
+        """Wait until every submitted sentence has been delivered, then signal completion"""
+        self._order.put_nowait(None)
+        try:
+            await self._sender
+        finally:
+            await self.close()
+
+        if self.chunk_count:
+            logger.info(f"✅ Audio sent to browser ({self.chunk_count} chunks, {self.sentence_count} sentences)")
+            # Small delay to ensure last audio chunk is fully sent
+            await asyncio.sleep(0.2)
+            await self.websocket.send(json.dumps({'type': 'tts_complete', 'utterance_id': self.utterance_id}))
+            logger.info("📢 TTS completion signal sent to client")
+
+    async def close(self):
+        """Cancel any synthesis still in flight"""
+        pending = [task for task in self._tasks if not task.done()]
+        if not self._sender.done():
+            pending.append(self._sender)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -11,10 +11,13 @@ from config.settings import config
 from server.assistant import VoiceAssistant
 
 
-async def start_server():
-    """Start the WebSocket server"""
+async def start_server(reuse_port=False):
+    """Start the WebSocket server (reuse_port lets several worker processes bind the same port)"""
+    # One VoiceAssistant per process holds the shared read-only state (OpenAI client,
+    # KB, compiled system prompt); handle_client creates a Session per connection
     logger.debug("🔧 Initializing VoiceAssistant instance")
     assistant = VoiceAssistant()
+    await assistant.start()
     logger.debug("✅ VoiceAssistant instance created successfully")
     
 
@@ -55,17 +58,22 @@ async def start_server():
     logger.debug(f"🚀 Starting WebSocket server")
     logger.debug(f"   Host: {config.server.host}")
     logger.debug(f"   Port: {config.server.port}")
+    logger.debug(f"   Reuse port: {reuse_port}")
     logger.debug(f"   Allowed origins: {config.server.allowed_origins}")
     
     async with websockets.serve(
         assistant.handle_client,
         config.server.host,
         config.server.port,
-        process_request=process_request
+        process_request=process_request,
+        reuse_port=reuse_port
     ):
         logger.info("✅ Server running")
         logger.info(f"📍 ws://{config.server.host}:{config.server.port}")
         logger.info("🎙️  Waiting for connections...\n")
         logger.debug(f"🔄 Server started at {datetime.now().isoformat()}")
         logger.debug("⏳ Entering infinite wait loop")
-        await asyncio.Future()  # Run forever
+        try:
+            await asyncio.Future()  # Run forever
+        finally:
+            await assistant.close()
@@ -0,0 +1,115 @@
+"""
+Multi-worker Supervisor
+
+Forks N worker processes that each run their own event loop and bind the same
+port with SO_REUSEPORT, so the kernel spreads connections across every core.
+The supervisor restarts crashed workers and forwards shutdown signals.
+"""
+
+import asyncio
+import os
+import signal
+import socket
+import time
+from loguru import logger
+
+from server.websocket_server import start_server
+
+
+# A worker that dies sooner than this after starting is considered crash-looping
+MIN_WORKER_UPTIME = 5.0
+MAX_RESTART_BACKOFF = 30.0
+
+
+async def _serve_until_signalled():
+    """Run the server in a worker until SIGTERM/SIGINT"""
+    loop = asyncio.get_running_loop()
+    task = asyncio.current_task()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, task.cancel)
+    try:
+        await start_server(reuse_port=True)
+    except asyncio.CancelledError:
+        logger.info(f"👋 Worker {os.getpid()} shutting down")
+
+
+def _run_worker(index):
+    """Entry point of a forked worker process"""
+    logger.info(f"👷 Worker {index} started (pid {os.getpid()})")
+    asyncio.run(_serve_until_signalled())
+
+
+def run_workers(workers):
+    """Fork `workers` server processes and supervise them until shutdown"""
+    if not hasattr(socket, "SO_REUSEPORT"):
+        logger.warning("⚠️ SO_REUSEPORT is not supported on this platform, running a single worker")
+        asyncio.run(start_server())
+        return
+
+    children = {}  # pid -> (index, started_at)
+    backoff = {}  # index -> current restart delay
+    stopping = False
+
+    def spawn(index):
+        pid = os.fork()
+        if pid == 0:
+            # Child: default signal behaviour, run the server, never return into the supervisor loop
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            exit_code = 0
+            try:
+                _run_worker(index)
+            except KeyboardInterrupt:
+                pass
+            except Exception as e:
+                logger.exception(f"❌ Worker {index} crashed: {e}")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        children[pid] = (index, time.monotonic())
+        logger.debug(f"   Spawned worker {index} as pid {pid}")
+
+    def forward(signum, frame):
+        nonlocal stopping
+        stopping = True
+        logger.info(f"🛑 Supervisor received signal {signum}, stopping {len(children)} workers")
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+
+    logger.info(f"🚀 Supervisor {os.getpid()} starting {workers} workers")
+    for index in range(workers):
+        spawn(index)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        index, started_at = children.pop(pid, (None, None))
+        if index is None:
+            continue
+        exit_code = os.waitstatus_to_exitcode(status)
+        if stopping:
+            logger.debug(f"   Worker {index} (pid {pid}) exited with {exit_code}")
+            continue
+
+        uptime = time.monotonic() - started_at
+        logger.error(f"❌ Worker {index} (pid {pid}) exited with {exit_code} after {uptime:.1f}s, restarting")
+        if uptime < MIN_WORKER_UPTIME:
+            delay = min(backoff.get(index, 0.5) * 2, MAX_RESTART_BACKOFF)
+        else:
+            delay = 0.5
+        backoff[index] = delay
+        time.sleep(delay)
+        if not stopping:
+            spawn(index)
+
+    logger.info("✅ All workers stopped")
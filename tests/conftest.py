@@ -0,0 +1,15 @@
+"""Shared fixtures: the KB shipped in data/ (run from the project root: python -m pytest)"""
+
+import os
+
+import pytest
+
+from server.knowledge_base import LevoWellnessSmartKB
+
+
+KB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "knowledge_base.json")
+
+
+@pytest.fixture(scope="session")
+def kb():
+    return LevoWellnessSmartKB(KB_PATH)
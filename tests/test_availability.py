@@ -0,0 +1,155 @@
+from datetime import date, datetime
+
+import pytest
+
+from server import availability
+from server.availability import AvailabilityEngine, normalize_slot, resolve_date
+
+MONDAY = date(2030, 1, 7)
+TUESDAY = date(2030, 1, 8)
+WEDNESDAY = date(2030, 1, 9)
+
+
+@pytest.fixture
+def engine(kb):
+    return AvailabilityEngine(kb)
+
+
+def test_mask_round_trip(engine):
+    mask = engine.mask(["3:00 PM", "6:00 AM", "not a slot"])
+    assert bin(mask).count("1") == 2
+    assert engine.slot_list(mask) == ["6:00 AM", "3:00 PM"]
+    assert engine.slot_list(engine.mask(engine.slots)) == engine.slots
+    assert engine.slots == sorted(engine.slots, key=availability.parse_slot)
+
+
+@pytest.mark.parametrize("window, first, last", [
+    # Each window runs from its first listed time to the start of the next one
+    ("morning", "6:00 AM", "11:00 AM"),
+    ("afternoon", "12:00 PM", "4:30 PM"),
+    ("Evening", "5:00 PM", "7:30 PM"),
+    (None, "6:00 AM", "7:30 PM"),
+])
+def test_window_masks(engine, window, first, last):
+    slots = engine.slot_list(engine.window_mask(window))
+    assert (slots[0], slots[-1]) == (first, last)
+
+
+def test_windows_cover_every_slot_once(engine):
+    windows = [engine.window_mask(name) for name in ("morning", "afternoon", "evening")]
+    assert sum(windows) == engine.window_mask(None)
+    assert engine.window_mask("midnight") == 0
+
+
+@pytest.mark.parametrize("name, day, window, expected", [
+    ("yoga", MONDAY, None, ["6:00 AM", "7:30 AM", "9:00 AM", "5:30 PM", "7:00 PM"]),
+    ("yoga", MONDAY, "morning", ["6:00 AM", "7:30 AM", "9:00 AM"]),
+    ("yoga", MONDAY, "afternoon", []),
+    ("Dermatologist", MONDAY, "afternoon", ["2:00 PM", "3:00 PM", "4:00 PM"]),
+    ("dermatologist", TUESDAY, None, []),
+    ("pain relief", MONDAY, "morning", ["10:00 AM", "11:00 AM"]),
+    ("unknown", MONDAY, None, []),
+])
+def test_free_slots(engine, name, day, window, expected):
+    assert engine.free_slots(name, day, window) == expected
+
+
+@pytest.mark.parametrize("name, day, window, after, expected", [
+    ("yoga", MONDAY, None, None, (MONDAY, "6:00 AM")),
+    ("yoga", MONDAY, "evening", None, (MONDAY, "5:30 PM")),
+    ("yoga", MONDAY, None, "9:00 AM", (MONDAY, "5:30 PM")),
+    # `after` only applies to the first day
+    ("yoga", MONDAY, None, "7:00 PM", (TUESDAY, "6:00 AM")),
+    ("dermatologist", TUESDAY, None, None, (WEDNESDAY, "2:30 PM")),
+    ("dermatologist", MONDAY, "morning", None, None),
+    ("unknown", MONDAY, None, None, None),
+])
+def test_earliest_free(engine, name, day, window, after, expected):
+    assert engine.earliest_free(name, day, window=window, after=after) == expected
+
+
+def test_booking_blocks_the_staff_member(engine):
+    # The dermatologist also runs the skin health service
+    assert engine.staff("dermatologist") == engine.staff("skin_health")
+    assert engine.book("dermatologist", MONDAY, "2:00 PM")
+    assert not engine.book("dermatologist", MONDAY, "2:00 PM")
+    assert not engine.is_free("skin_health", MONDAY, "2:00 PM")
+    assert engine.earliest_free("dermatologist", MONDAY) == (MONDAY, "3:00 PM")
+    assert engine.booked_slots() == [("Dr. Anjali Khanna", MONDAY, "2:00 PM")]
+
+    engine.release("dermatologist", MONDAY, "2:00 PM")
+    assert engine.is_free("skin_health", MONDAY, "2:00 PM")
+    assert engine.booked_slots() == []
+
+
+@pytest.mark.parametrize("name, day, slot", [
+    ("dermatologist", TUESDAY, "2:00 PM"),  # Not scheduled that day
+    ("yoga", MONDAY, "2:00 PM"),
+    ("yoga", MONDAY, "2:15 PM"),  # Not a slot at all
+    ("unknown", MONDAY, "2:00 PM"),
+])
+def test_book_unscheduled(engine, name, day, slot):
+    assert not engine.book(name, day, slot)
+    assert engine.booked_slots() == []
+
+
+def test_group_class_capacity(engine):
+    capacity = engine.capacity("yoga")
+    assert capacity == 12
+    assert engine.capacity("dermatologist") == 1
+    for _ in range(capacity - 1):
+        assert engine.book("yoga", MONDAY, "6:00 AM")
+    assert engine.is_free("yoga", MONDAY, "6:00 AM")
+    assert engine.book("yoga", MONDAY, "6:00 AM")
+    assert not engine.is_free("yoga", MONDAY, "6:00 AM")
+    assert not engine.book("yoga", MONDAY, "6:00 AM")
+    assert len(engine.booked_slots()) == capacity
+
+    # A cancellation frees one seat
+    engine.release("yoga", MONDAY, "6:00 AM")
+    assert engine.is_free("yoga", MONDAY, "6:00 AM")
+    assert len(engine.booked_slots()) == capacity - 1
+
+
+def test_replace_bookings(engine):
+    engine.book("spa", MONDAY, "10:00 AM")
+    staff = engine.staff("spa")
+    yoga = engine.staff("yoga")
+    loaded = engine.replace_bookings([
+        (staff, MONDAY, "11:00 AM"),
+        (staff, MONDAY, "nonsense"),
+        (yoga, MONDAY.isoformat(), "7:30 AM"),
+        (yoga, MONDAY.isoformat(), "7:30 AM"),
+    ])
+    assert loaded == 3
+    assert engine.is_free("spa", MONDAY, "10:00 AM")
+    assert not engine.is_free("spa", MONDAY, "11:00 AM")
+    assert engine.is_free("yoga", MONDAY, "7:30 AM")
+    assert sorted(engine.booked_slots()) == sorted([
+        (staff, MONDAY, "11:00 AM"), (yoga, MONDAY, "7:30 AM"), (yoga, MONDAY, "7:30 AM"),
+    ])
+
+
+def test_past_slots_on_the_clinic_clock(engine, monkeypatch):
+    now = datetime(2030, 1, 7, 15, 0, tzinfo=availability.ZoneInfo("Asia/Kolkata"))
+    monkeypatch.setattr(availability, "clinic_now", lambda: now)
+    assert resolve_date("today") == MONDAY
+    assert resolve_date("tomorrow") == TUESDAY
+    assert resolve_date("monday") == MONDAY
+    assert resolve_date("sunday") == date(2030, 1, 13)
+    assert engine.free_slots("spa", "today") == ["4:00 PM", "5:00 PM", "6:00 PM", "7:00 PM"]
+    assert engine.free_slots("spa", date(2030, 1, 6)) == []
+    assert not engine.book("spa", "today", "3:00 PM")
+    assert engine.earliest_free("dermatologist", "today") == (MONDAY, "4:00 PM")
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("3 pm", "3:00 PM"),
+    ("15:00", "3:00 PM"),
+    ("3:00PM", "3:00 PM"),
+    ("10 a.m.", "10:00 AM"),
+    ("12", "12:00 PM"),
+    ("noonish", None),
+])
+def test_normalize_slot(text, expected):
+    assert normalize_slot(text) == expected
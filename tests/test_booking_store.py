@@ -0,0 +1,106 @@
+import asyncio
+import sqlite3
+from datetime import date
+
+import pytest
+import pytest_asyncio
+
+from server.booking_store import BookingStore
+
+MONDAY = date(2030, 1, 7)
+
+
+@pytest_asyncio.fixture
+async def store(tmp_path):
+    store = BookingStore(str(tmp_path / "bookings.db"))
+    await store.start()
+    yield store
+    await store.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("callers, capacity", [(1, 1), (20, 1), (20, 8), (8, 8), (3, 12)])
+async def test_concurrent_reserve(store, callers, capacity):
+    results = await asyncio.gather(*(
+        store.reserve_if_free("Vikram Nair", MONDAY, "6:00 AM", name=f"caller {n}", capacity=capacity)
+        for n in range(callers)
+    ))
+    winners = [booking_id for booking_id in results if booking_id is not None]
+    assert len(winners) == min(callers, capacity)
+    assert len(set(winners)) == len(winners)
+    assert store.reserved == len(winners)
+    assert store.conflicts == callers - len(winners)
+    assert await store.bookings(MONDAY) == [("Vikram Nair", MONDAY, "6:00 AM")] * len(winners)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reserve_across_workers(tmp_path):
+    # Two worker processes share one ledger file
+    path = str(tmp_path / "bookings.db")
+    first, second = BookingStore(path), BookingStore(path)
+    await first.start()
+    await second.start()
+    try:
+        results = await asyncio.gather(*(
+            (first if n % 2 else second).reserve_if_free("Neha Verma", MONDAY, "3:00 PM", service="spa")
+            for n in range(10)
+        ))
+    finally:
+        await first.close()
+        await second.close()
+    assert sum(booking_id is not None for booking_id in results) == 1
+
+
+@pytest.mark.asyncio
+async def test_slots_are_independent(store):
+    results = await asyncio.gather(
+        store.reserve_if_free("Neha Verma", MONDAY, "3:00 PM"),
+        store.reserve_if_free("Neha Verma", MONDAY, "4:00 PM"),
+        store.reserve_if_free("Neha Verma", "2030-01-08", "3:00 PM"),
+        store.reserve_if_free("Radhika Mehta", MONDAY, "3:00 PM"),
+    )
+    assert None not in results
+    assert len(await store.bookings(MONDAY)) == 4
+    assert await store.bookings(date(2030, 1, 8)) == [("Neha Verma", date(2030, 1, 8), "3:00 PM")]
+
+
+@pytest.mark.asyncio
+async def test_cancel_frees_a_seat(store):
+    for _ in range(2):
+        assert await store.reserve_if_free("Sneha Reddy", MONDAY, "7:00 AM", capacity=2) is not None
+    assert await store.reserve_if_free("Sneha Reddy", MONDAY, "7:00 AM", capacity=2) is None
+    assert await store.cancel("Sneha Reddy", MONDAY, "7:00 AM")
+    assert await store.reserve_if_free("Sneha Reddy", MONDAY, "7:00 AM", capacity=2) is not None
+    assert await store.cancel("Sneha Reddy", MONDAY, "7:00 AM")
+    assert await store.cancel("Sneha Reddy", MONDAY, "7:00 AM")
+    assert not await store.cancel("Sneha Reddy", MONDAY, "7:00 AM")
+    assert await store.bookings(MONDAY) == []
+
+
+@pytest.mark.asyncio
+async def test_ledger_without_seats_is_migrated(tmp_path):
+    path = str(tmp_path / "bookings.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE bookings (id INTEGER PRIMARY KEY, staff TEXT NOT NULL, date TEXT NOT NULL, slot TEXT NOT NULL, "
+        "service TEXT NOT NULL DEFAULT '', name TEXT NOT NULL DEFAULT '', phone TEXT NOT NULL DEFAULT '', "
+        "created_at TEXT NOT NULL DEFAULT (datetime('now')), UNIQUE (staff, date, slot))"
+    )
+    conn.execute("INSERT INTO bookings (staff, date, slot) VALUES ('Vikram Nair', '2030-01-07', '6:00 AM')")
+    conn.commit()
+    conn.close()
+
+    store = BookingStore(path)
+    await store.start()
+    try:
+        assert await store.reserve_if_free("Vikram Nair", MONDAY, "6:00 AM") is None
+        assert await store.reserve_if_free("Vikram Nair", MONDAY, "6:00 AM", capacity=2) is not None
+        assert len(await store.bookings(MONDAY)) == 2
+    finally:
+        await store.close()
+
+
+@pytest.mark.asyncio
+async def test_reserve_before_start(tmp_path):
+    with pytest.raises(RuntimeError):
+        await BookingStore(str(tmp_path / "bookings.db")).reserve_if_free("Neha Verma", MONDAY, "3:00 PM")
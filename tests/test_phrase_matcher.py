@@ -0,0 +1,60 @@
+import pytest
+
+from server.phrase_matcher import PhraseMatcher
+
+
+def matches(matcher, text):
+    return sorted(matcher.finditer(text))
+
+
+@pytest.mark.parametrize("phrases, text, expected", [
+    # Overlapping and nested phrases are all reported
+    ({"he": 1, "she": 2, "his": 3, "hers": 4}, "ushers", [(1, 4, 2), (2, 4, 1), (2, 6, 4)]),
+    ({"hold on": "delay", "please hold on": "delay"}, "please hold on", [(0, 14, "delay"), (7, 14, "delay")]),
+    ({"let me check": "check", "checking": "check"}, "let me check. checking", [(0, 12, "check"), (14, 22, "check")]),
+    # Repeated occurrences
+    ({"no": "result"}, "no, no", [(0, 2, "result"), (4, 6, "result")]),
+    # Substrings, not words, unless word boundaries are asked for
+    ({"on": "detail"}, "one moment", [(0, 2, "detail")]),
+    ({"doctor": "dept"}, "the doctors", [(4, 10, "dept")]),
+    # Case-sensitive: callers lower-case both sides
+    ({"yes": "result"}, "Yes", []),
+    ({"abc": 1}, "", []),
+])
+def test_finditer(phrases, text, expected):
+    matcher = PhraseMatcher()
+    for phrase, payload in phrases.items():
+        matcher.add(phrase, payload)
+    matcher.build()
+    assert matches(matcher, text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("book now", [(0, 4, "book")]),
+    ("booked", []),
+    ("rebook", []),
+    ("book, time", [(0, 4, "book"), (6, 10, "time")]),
+    ("sometime", []),
+])
+def test_word_boundaries(text, expected):
+    matcher = PhraseMatcher(word_boundaries=True)
+    matcher.add("book", "book")
+    matcher.add("time", "time")
+    assert matches(matcher, text) == expected
+
+
+def test_same_phrase_keeps_every_payload():
+    matcher = PhraseMatcher()
+    matcher.add("booked", "result")
+    matcher.add("booked", "booking")
+    matcher.add("", "ignored")
+    assert matcher.phrase_count == 2
+    assert matches(matcher, "booked") == [(0, 6, "booking"), (0, 6, "result")]
+
+
+def test_add_after_build_rebuilds():
+    matcher = PhraseMatcher()
+    matcher.add("spa", 1)
+    assert matches(matcher, "spa day") == [(0, 3, 1)]
+    matcher.add("day", 2)
+    assert matches(matcher, "spa day") == [(0, 3, 1), (4, 7, 2)]
@@ -0,0 +1,122 @@
+"""ReplyRules against the rewrites of the original _process_llm_response rule chain
+
+Each case is (caller's message, earlier history, LLM reply, reply after the
+original rules). The streaming filter must give the same text whether the
+reply arrives in one piece, word by word or character by character.
+"""
+
+import pytest
+
+from server.reply_rules import CHECKING_ACKNOWLEDGEMENT, HELP_ACKNOWLEDGEMENT, ReplyRules
+
+
+def user(text):
+    return {"role": "user", "content": text}
+
+
+def assistant(text):
+    return {"role": "assistant", "content": text}
+
+
+SPA_MENU = (
+    "Our spa menu includes: deep tissue massage, hot stone therapy, aromatherapy, foot reflexology, "
+    "body scrubs, facials, couples packages, and many more relaxing treatments for you to enjoy with "
+    "friends and family during weekends and holidays all year round, with soothing music, herbal tea "
+    "and a quiet lounge to rest in after your treatment."
+)
+
+BASELINE_CASES = [
+    # Redundant questions after the greeting
+    ("hi", [], "How can I help you today?", HELP_ACKNOWLEDGEMENT),
+    ("hi", [], "Hello! I can help you with bookings and prices.", HELP_ACKNOWLEDGEMENT),
+    ("hi", [], "Sure! What would you like to book?", HELP_ACKNOWLEDGEMENT),
+    ("hi", [], "What would you like to do", "What would you like to do"),
+    ("hi", [], "Hello! Spa is open today.", "Hello! Spa is open today."),
+    # Delay phrases
+    ("is spa available on monday", [], "Hold on.", CHECKING_ACKNOWLEDGEMENT),
+    ("tell me about yoga", [], "Please wait.", HELP_ACKNOWLEDGEMENT),
+    ("price of spa", [], "Spa is ₹2500. Please hold on. It lasts an hour.", "Spa is ₹2500. It lasts an hour."),
+    ("is spa free", [], "Let me check. Yes, spa is available at 3:00 PM.",
+     "Let me check. Yes, spa is available at 3:00 PM."),
+    # 2 sentences for answers, 4 for booking confirmations
+    ("tell me about spa", [], "Spa is relaxing. It lasts an hour. It uses oils. It is popular.",
+     "Spa is relaxing. It lasts an hour."),
+    ("book it", [], "Your appointment is booked for Monday at 3:00 PM. Name is Ravi. Phone is 98765. See you then. Bye now.",
+     "Your appointment is booked for Monday at 3:00 PM. Name is Ravi. Phone is 98765. See you then."),
+    ("book it", [], "Great. Thank you. Your appointment is confirmed for Monday at 3:00 PM. See you.",
+     "Great. Thank you. Your appointment is confirmed for Monday at 3:00 PM. See you."),
+    ("spa", [], SPA_MENU, "Our spa menu includes: deep tissue massage."),
+    # Stop after the answer
+    ("spa price", [], "Spa is ₹2500. Let me confirm the time for you.", "Spa is ₹2500."),
+    ("is yoga on monday", [], "Yoga runs on Monday. Let me check the times. I will tell you soon.",
+     "Yoga runs on Monday. Let me check the times."),
+    # Service listings
+    ("what services do you have", [],
+     "We have Salon, Aesthetics, Wellness and Doctors with prices from ₹500. Which one interests you?",
+     "We offer Salon, Aesthetics, Wellness, Doctors."),
+    ("what services do you have", [], "We have Salon and Wellness. Which one would you like?",
+     "We have Salon and Wellness."),
+    # Doctor names in booking confirmations
+    ("book derm", [user("I need the dermatologist"), assistant("Dr. Anjali Khanna is free at 3 PM.")],
+     "You're booked with the doctor on Monday at 3:00 PM.",
+     "You're booked with Dr. Anjali Khanna (Dermatologist) on Monday at 3:00 PM."),
+    ("book it", [], "You're booked with the pain relief doctor on Monday at 2:00 PM.",
+     "You're booked with Dr. Arvind Singh (Pain Relief) on Monday at 2:00 PM."),
+    ("book it", [], "You're booked with Dr. Arvind Singh on Monday at 2:00 PM.",
+     "You're booked with Dr. Arvind Singh (Pain Relief) on Monday at 2:00 PM."),
+    ("book", [], "Okay! You're booked for the nutritionist on Monday at 11:00 AM.",
+     "Okay! You're booked for the nutritionist on Monday at 11:00 AM."),
+    ("tell me about the dermatologist", [], "The dermatologist doctor sees patients in the afternoon.",
+     "The dermatologist doctor sees patients in the afternoon."),
+]
+
+
+@pytest.fixture(scope="module")
+def rules(kb):
+    return ReplyRules(kb)
+
+
+def stream(rules, chunks, user_text, history):
+    reply = rules.stream(user_text, history)
+    released = []
+    for chunk in chunks:
+        released.extend(reply.feed(chunk))
+    released.extend(reply.finish())
+    assert " ".join(released) == reply.text
+    return reply.text
+
+
+def words(text):
+    parts = text.split(" ")
+    return [part + " " for part in parts[:-1]] + parts[-1:]
+
+
+@pytest.mark.parametrize("user_text, earlier, reply, expected", BASELINE_CASES)
+def test_apply_matches_baseline(rules, user_text, earlier, reply, expected):
+    history = earlier + [user(user_text)]
+    assert rules.apply(reply, user_text, history) == expected
+
+
+@pytest.mark.parametrize("user_text, earlier, reply, expected", BASELINE_CASES)
+@pytest.mark.parametrize("split", [list, words], ids=["chars", "words"])
+def test_stream_matches_baseline(rules, split, user_text, earlier, reply, expected):
+    history = earlier + [user(user_text)]
+    assert stream(rules, split(reply), user_text, history) == expected
+
+
+def test_first_sentence_released_before_the_end(rules):
+    reply = rules.stream("price of spa", [user("price of spa")])
+    assert reply.feed("Spa is ₹2500. It ") == ["Spa is ₹2500."]
+    assert reply.feed("lasts an hour. It uses") == ["It lasts an hour."]
+    assert reply.exhausted is False
+    assert reply.feed(" oils. More") == []
+    assert reply.exhausted is True
+    assert reply.finish() == []
+    assert reply.text == "Spa is ₹2500. It lasts an hour."
+
+
+def test_opener_held_until_the_next_sentence(rules):
+    reply = rules.stream("hi", [user("hi")])
+    assert reply.feed("Hello! ") == []
+    assert reply.feed("Spa is open today. ") == ["Hello!", "Spa is open today."]
+    assert reply.finish() == []